@@ -0,0 +1,97 @@
+"""拼版后端基准。
+
+分别用 pypdf 和 pikepdf 后端运行 `make_booklet`、`split_booklet`、`make_paper`
+和 `split_paper`，输入是 `tests/sample` 中的文件和一个合成的大文件
+（每页一段较长的文字内容流，所有页面共用一个字体和一张图片）。
+每项取多次运行的最小值。
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pikepdf
+from pikepdf import Dictionary, Name
+
+from py_pdf.booklet import make_booklet, split_booklet
+from py_pdf.paper import make_paper, split_paper
+
+SAMPLES = {
+    "A4.pdf": (make_booklet, make_paper),
+    "A3-booklet.pdf": (split_booklet,),
+    "A3-paper.pdf": (split_paper,),
+}
+
+
+def make_synthetic(path: Path, pages: int, lines: int = 60):
+    with pikepdf.new() as pdf:
+        font = pdf.make_indirect(
+            Dictionary(Type=Name.Font, Subtype=Name.Type1, BaseFont=Name.Helvetica)
+        )
+        side = 64
+        image = pdf.make_stream(
+            os.urandom(side * side * 3),
+            Type=Name.XObject,
+            Subtype=Name.Image,
+            Width=side,
+            Height=side,
+            ColorSpace=Name.DeviceRGB,
+            BitsPerComponent=8,
+        )
+        resources = Dictionary(Font=Dictionary(F1=font), XObject=Dictionary(Im0=image))
+        for i in range(pages):
+            ops = [b"q 100 0 0 100 400 700 cm /Im0 Do Q", b"BT /F1 10 Tf 40 780 Td"]
+            ops += [b"(page %d line %d) Tj 0 -12 Td" % (i, j) for j in range(lines)]
+            ops.append(b"ET")
+            page = pdf.add_blank_page(page_size=(595, 842))
+            page.Resources = resources
+            page.Contents = pdf.make_stream(b"\n".join(ops))
+        pdf.save(path)
+
+
+def _time(func, input_path: Path, output_path: Path, backend: str, repeat: int):
+    res = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(input_path, output_path, backend=backend)
+        res = min(res, time.perf_counter() - start)
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-p", "--pages", type=int, default=2_000, help="合成文件页数")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="运行次数")
+    parser.add_argument(
+        "--sample-dir", type=Path, default=Path("tests/sample"), help="样例目录"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        synthetic = Path(tmp) / f"synthetic-{args.pages}.pdf"
+        make_synthetic(synthetic, args.pages)
+        cases = [(args.sample_dir / name, funcs) for name, funcs in SAMPLES.items()]
+        cases.append(
+            (synthetic, (make_booklet, split_booklet, make_paper, split_paper))
+        )
+
+        print(
+            f"{'input':22} {'tool':14} {'pypdf/s':>8} {'pikepdf/s':>9} {'speedup':>8}"
+        )
+        for input_path, funcs in cases:
+            for func in funcs:
+                output_path = Path(tmp) / "output.pdf"
+                times = [
+                    _time(func, input_path, output_path, backend, args.repeat)
+                    for backend in ("pypdf", "pikepdf")
+                ]
+                print(
+                    f"{input_path.name:22} {func.__name__:14} "
+                    f"{times[0]:8.3f} {times[1]:9.3f} {times[0] / times[1]:7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""addpn 启动时间基准。
+
+分别测量只导入 `py_pdf.pagenum.cli`（字体按需注册）和导入后注册 `FONT_DICT`
+中全部字体（即原来导入时的行为）所需的时间，每项取多次运行的最小值。
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+LAZY = "import py_pdf.pagenum.cli"
+EAGER = """\
+import py_pdf.pagenum.cli
+from py_pdf.pagenum.font import FONT_DICT, TTFError, TTFont, pdfmetrics
+for name, file in FONT_DICT.items():
+    try:
+        pdfmetrics.registerFont(TTFont(name, file))
+    except TTFError:
+        pass
+"""
+
+
+def _time(code: str, repeat: int) -> float:
+    res = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        res = min(res, time.perf_counter() - start)
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="运行次数")
+    args = parser.parse_args()
+
+    lazy = _time(LAZY, args.repeat)
+    eager = _time(EAGER, args.repeat)
+    print(f"lazy  {lazy * 1000:8.1f} ms")
+    print(f"eager {eager * 1000:8.1f} ms")
+    print(f"saved {(eager - lazy) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""大纲提取基准。
+
+用 `synthetic.add_outline` 生成一个带有大量书签的 PDF：书签交替使用命名目标
+（字符串）、显式目标（数组）和 GoTo 动作，命名目标放在分段的名称树中。
+然后测量 `get_outline` 的耗时，并检查每个书签的页码；
+再用提取出的大纲测量 `set_outline` 的耗时。
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pikepdf
+from synthetic import add_outline
+
+from py_pdf.outline.core import get_outline, set_outline
+
+
+def make_outline_pdf(path: Path, items: int, pages: int, leaf: int = 64):
+    """第 i 个书签指向第 i % pages 页。"""
+    pdf = pikepdf.new()
+    for _ in range(pages):
+        pdf.add_blank_page(page_size=(200, 200))
+    add_outline(pdf, items, leaf=leaf)
+    pdf.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--items", type=int, default=50_000, help="书签数")
+    parser.add_argument("-p", "--pages", type=int, default=1_000, help="页数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "outline.pdf"
+        make_outline_pdf(path, args.items, args.pages)
+
+        start = time.perf_counter()
+        outline = get_outline(path)
+        elapsed = time.perf_counter() - start
+
+        lines = outline.splitlines()
+        assert len(lines) == args.items
+        for i, line in enumerate(lines):
+            assert int(line.split()[-1]) == i % args.pages + 1, line
+        print(f"{args.items} items, {args.pages} pages")
+        print(f"get {elapsed:8.2f} s")
+
+        txt_path = Path(tmp) / "outline.txt"
+        txt_path.write_text(outline, encoding="utf-8")
+        start = time.perf_counter()
+        set_outline(path, Path(tmp) / "output.pdf", txt_path, 0)
+        print(f"set {time.perf_counter() - start:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""输出配置基准。
+
+把同一个 PDF 复制多份拼接成输入（每份各带一套字体和图片，模拟合并来的文档），
+然后对每个输出配置分别运行 `make_booklet` 和 `add_pagenum`，
+报告输出文件大小和耗时（含写出后的重写）。
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pikepdf
+
+from py_pdf._com.profile import PROFILES
+from py_pdf.booklet import make_booklet
+from py_pdf.pagenum.core import add_pagenum
+
+
+def make_input(path: Path, source: Path, copies: int):
+    with pikepdf.new() as pdf:
+        for _ in range(copies):
+            with pikepdf.open(source) as src:
+                pdf.pages.extend(src.pages)
+        pdf.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "-i", "--input", type=Path, default=Path("tests/sample/A4.pdf"), help="源文件"
+    )
+    parser.add_argument("-n", "--copies", type=int, default=20, help="复制份数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.pdf"
+        make_input(input_path, args.input, args.copies)
+        print(f"input {input_path.stat().st_size / 1024:10.1f} KiB")
+
+        tools = {
+            "booklet": lambda output, profile: make_booklet(
+                input_path, output, profile=profile
+            ),
+            "addpn": lambda output, profile: add_pagenum(
+                input_path, output, "", profile=profile
+            ),
+        }
+        print(f"{'tool':8} {'profile':8} {'size/KiB':>10} {'time/s':>8}")
+        for tool, run in tools.items():
+            for name, profile in PROFILES.items():
+                output = Path(tmp) / f"{tool}-{name}.pdf"
+                start = time.perf_counter()
+                run(output, profile)
+                elapsed = time.perf_counter() - start
+                size = output.stat().st_size / 1024
+                print(f"{tool:8} {name:8} {size:10.1f} {elapsed:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""基准测试套件。
+
+用 `synthetic.make_pdf` 生成输入，对每个入口函数在独立的子进程中测量耗时和峰值
+内存（RSS），多次运行取最小值。结果保存为 JSON，并与基线比较：
+耗时或峰值内存超过基线的比例大于阈值即为退化，退出码为 1。
+
+    python benchmarks/suite.py                     # 运行并与 baseline.json 比较
+    python benchmarks/suite.py --update-baseline   # 运行并更新基线
+
+基线只在生成参数相同时比较，且只对同一台机器有意义。
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from synthetic import make_pdf
+
+from py_pdf.outline.core import get_outline
+
+this_dir = Path(__file__).parent
+
+MIN_SECONDS = 0.05
+
+# 每项的代码在子进程中执行，只计时 `run` 这一行
+CASES = {
+    "make_booklet": (
+        "from py_pdf.booklet import make_booklet",
+        "make_booklet(INPUT, OUTPUT)",
+    ),
+    "split_booklet": (
+        "from py_pdf.booklet import split_booklet",
+        "split_booklet(INPUT, OUTPUT)",
+    ),
+    "make_paper": ("from py_pdf.paper import make_paper", "make_paper(INPUT, OUTPUT)"),
+    "split_paper": (
+        "from py_pdf.paper import split_paper",
+        "split_paper(INPUT, OUTPUT)",
+    ),
+    "add_pagenum": (
+        "from py_pdf.pagenum.core import add_pagenum",
+        "add_pagenum(INPUT, OUTPUT, '')",
+    ),
+    "get_outline": (
+        "from py_pdf.outline.core import get_outline",
+        "get_outline(INPUT)",
+    ),
+    "set_outline": (
+        "from py_pdf.outline.core import set_outline",
+        "set_outline(INPUT, OUTPUT, OUTLINE, 0)",
+    ),
+    "stat_pdf": (
+        "from py_pdf.statpage import stat_pdf",
+        "sum(item.count for item in stat_pdf([STAT_DIR]))",
+    ),
+}
+
+# 峰值内存取 /proc 中的 VmHWM（KiB）。ru_maxrss 在 execve 后保留父进程的值，
+# 子进程的结果会被父进程（生成输入时）的内存占用掩盖。
+SCRIPT = """\
+import resource
+import time
+from pathlib import Path
+INPUT, OUTPUT, OUTLINE, STAT_DIR = map(Path, {paths!r})
+{setup}
+start = time.perf_counter()
+{run}
+elapsed = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as f:
+        peak = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak)
+"""
+
+
+def _measure(case: str, paths: list[str], repeat: int) -> dict[str, float]:
+    setup, run = CASES[case]
+    script = SCRIPT.format(paths=paths, setup=setup, run=run)
+    seconds = rss = float("inf")
+    for _ in range(repeat):
+        res = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, check=True, text=True
+        )
+        elapsed, maxrss = res.stdout.split()[-2:]
+        seconds = min(seconds, float(elapsed))
+        rss = min(rss, int(maxrss))
+    return {"seconds": round(seconds, 4), "peak_rss_kib": rss}
+
+
+def run_suite(params: dict[str, int], cases: list[str], repeat: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        input_path = tmp / "input.pdf"
+        make_pdf(
+            input_path,
+            params["pages"],
+            images=params["images"],
+            outline=params["outline"],
+            depth=params["depth"],
+        )
+        outline_path = tmp / "outline.txt"
+        outline_path.write_text(get_outline(input_path), encoding="utf-8")
+
+        # stat_pdf 的输入：一个大文件和许多小文件
+        stat_dir = tmp / "stat"
+        stat_dir.mkdir()
+        shutil.copy(input_path, stat_dir / "input.pdf")
+        small = tmp / "small.pdf"
+        make_pdf(small, 10, images=1, outline=20)
+        for i in range(params["files"]):
+            shutil.copy(small, stat_dir / f"small-{i:04d}.pdf")
+
+        paths = [
+            str(p) for p in (input_path, tmp / "output.pdf", outline_path, stat_dir)
+        ]
+        results = {}
+        for case in cases:
+            results[case] = _measure(case, paths, repeat)
+            print(
+                f"{case:14} {results[case]['seconds']:8.3f} s "
+                f"{results[case]['peak_rss_kib'] / 1024:8.1f} MiB",
+                flush=True,
+            )
+
+    return {
+        "params": params,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    time_threshold: float,
+    rss_threshold: float,
+) -> list[str]:
+    """返回退化的条目。很短的耗时波动大，低于 `MIN_SECONDS` 的差值不算退化。"""
+    regressions = []
+    for case, res in current["results"].items():
+        if (base := baseline["results"].get(case)) is None:
+            continue
+        for key, threshold, floor in (
+            ("seconds", time_threshold, MIN_SECONDS),
+            ("peak_rss_kib", rss_threshold, 0),
+        ):
+            ratio = res[key] / base[key] - 1
+            mark = ""
+            if ratio > threshold and res[key] - base[key] > floor:
+                mark = "  REGRESSION"
+                regressions.append(f"{case} {key}")
+            print(
+                f"{case:14} {key:13} {base[key]:>10} -> {res[key]:>10} {ratio:+7.1%}{mark}"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("-p", "--pages", type=int, default=2_000, help="页数")
+    parser.add_argument("--images", type=int, default=16, help="不同图片的数量")
+    parser.add_argument("--outline", type=int, default=20_000, help="书签数")
+    parser.add_argument("--depth", type=int, default=4, help="大纲层数")
+    parser.add_argument("--files", type=int, default=200, help="stat_pdf 的小文件数")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="运行次数")
+    parser.add_argument(
+        "-k", "--case", action="append", choices=CASES, help="只运行指定的项，可重复"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, default=this_dir / "results.json", help="结果文件"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=this_dir / "baseline.json", help="基线文件"
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="用结果更新基线")
+    parser.add_argument(
+        "--time-threshold", type=float, default=0.2, help="耗时退化阈值，默认 20%%"
+    )
+    parser.add_argument(
+        "--rss-threshold", type=float, default=0.1, help="内存退化阈值，默认 10%%"
+    )
+    args = parser.parse_args()
+
+    params = {
+        "pages": args.pages,
+        "images": args.images,
+        "outline": args.outline,
+        "depth": args.depth,
+        "files": args.files,
+    }
+    current = run_suite(params, args.case or list(CASES), args.repeat)
+    args.output.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+    print(f"save as\n{args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline: {args.baseline}")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline["params"] != params:
+        print(f"baseline params differ, not compared: {baseline['params']}")
+        return 0
+    regressions = compare(current, baseline, args.time_threshold, args.rss_threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,157 @@
+"""合成 PDF 生成器。
+
+生成的文件包含：
+- 混合尺寸和方向的页面（A4、横向 A4、Letter、A3、横向 A5）；
+- 每页几十行文字，使用嵌入（子集化）的 TrueType 字体；
+- 若干张不可压缩的图片，按页轮流引用；
+- 多层嵌套的大纲，书签交替使用命名目标（字符串）、显式目标（数组）
+  和 GoTo 动作，第 i 个书签指向第 i % pages 页；
+- 命名目标放在两层的名称树（/Kids + /Limits）中。
+"""
+
+import io
+import os
+from pathlib import Path
+from typing import Any
+
+import pikepdf
+from pikepdf import Array, Dictionary, Name, String
+from reportlab.lib.pagesizes import A3, A4, A5, landscape, letter
+from reportlab.pdfgen.canvas import Canvas
+
+from py_pdf.pagenum.font import DEFAULT_FONT_NAME, load_font
+
+PAGE_SIZES = [A4, landscape(A4), letter, A3, landscape(A5)]
+
+
+def _draw_pages(pages: int, lines: int) -> bytes:
+    packet = io.BytesIO()
+    canvas = Canvas(packet)
+    font_name = load_font(DEFAULT_FONT_NAME)
+    for i in range(pages):
+        width, height = PAGE_SIZES[i % len(PAGE_SIZES)]
+        canvas.setPageSize((width, height))
+        canvas.setFont(font_name, 10)
+        for j in range(lines):
+            y = height - 40 - 12 * j
+            if y < 40:
+                break
+            canvas.drawString(40, y, f"page {i} line {j}: The quick brown fox 0123")
+        canvas.showPage()
+    canvas.save()
+    return packet.getvalue()
+
+
+def _add_images(pdf: pikepdf.Pdf, count: int, side: int):
+    images = [
+        pdf.make_stream(
+            os.urandom(side * side * 3),
+            Type=Name.XObject,
+            Subtype=Name.Image,
+            Width=side,
+            Height=side,
+            ColorSpace=Name.DeviceRGB,
+            BitsPerComponent=8,
+        )
+        for _ in range(count)
+    ]
+    for i, page in enumerate(pdf.pages):
+        resources = Dictionary(page.obj.get(Name.Resources, Dictionary()))
+        resources.XObject = Dictionary(Im0=images[i % count])
+        page.Resources = resources
+        page.contents_add(pdf.make_stream(b"q 120 0 0 120 40 40 cm /Im0 Do Q"))
+
+
+def _name_tree(pdf: pikepdf.Pdf, names: list[tuple[str, Any]], leaf: int):
+    """两层名称树：根的 /Kids 是中间节点，中间节点的 /Kids 是叶子节点。"""
+
+    def node(kids: list[pikepdf.Object], first: str, last: str, key: str):
+        return pdf.make_indirect(
+            Dictionary(
+                {key: Array(kids), "/Limits": Array([String(first), String(last)])}
+            )
+        )
+
+    leaves = []
+    for start in range(0, len(names), leaf):
+        chunk = names[start : start + leaf]
+        entries = [v for name, dest in chunk for v in (String(name), dest)]
+        leaves.append((node(entries, chunk[0][0], chunk[-1][0], "/Names"), chunk))
+
+    middles = Array()
+    for start in range(0, len(leaves), leaf):
+        chunk = leaves[start : start + leaf]
+        kids = [leaf_node for leaf_node, _ in chunk]
+        middles.append(node(kids, chunk[0][1][0][0], chunk[-1][1][-1][0], "/Kids"))
+    return pdf.make_indirect(Dictionary(Kids=middles))
+
+
+def add_outline(pdf: pikepdf.Pdf, items: int, depth: int = 1, leaf: int = 64):
+    """添加 `items` 个书签，层级依次为 1, 2, ..., depth, 1, 2, ...。"""
+    pages = len(pdf.pages)
+    page_objs = [page.obj for page in pdf.pages]
+    if items == 0:
+        return
+
+    names = [
+        (f"d{i:08d}", Array([page_objs[i % pages], Name.Fit]))
+        for i in range(0, items, 3)
+    ]
+    pdf.Root.Names = Dictionary(Dests=_name_tree(pdf, names, leaf))
+
+    outlines = pdf.make_indirect(Dictionary(Type=Name.Outlines))
+    # (字典, 层级, 最后一个子节点, 子孙数)
+    stack: list[list[Any]] = [[outlines, 0, None, 0]]
+
+    def close(node: list[Any]):
+        item, _, last, count = node
+        if last is not None:
+            item.Last = last
+        item.Count = count
+
+    for i in range(items):
+        level = i % depth + 1
+        while level <= stack[-1][1]:
+            close(stack.pop())
+        parent = stack[-1]
+        dest = Array([page_objs[i % pages], Name.Fit])
+        item = Dictionary(Title=String(f"item {i}"), Parent=parent[0])
+        match i % 3:
+            case 0:
+                item.Dest = String(f"d{i:08d}")
+            case 1:
+                item.Dest = dest
+            case 2:
+                item.A = Dictionary(S=Name.GoTo, D=dest)
+        item = pdf.make_indirect(item)
+        if parent[2] is None:
+            parent[0].First = item
+        else:
+            parent[2].Next = item
+            item.Prev = parent[2]
+        parent[2] = item
+        for node in stack:
+            node[3] += 1
+        stack.append([item, level, None, 0])
+
+    while stack:
+        close(stack.pop())
+    pdf.Root.Outlines = outlines
+
+
+def make_pdf(
+    path: Path,
+    pages: int,
+    *,
+    lines: int = 40,
+    images: int = 8,
+    image_side: int = 128,
+    outline: int = 0,
+    depth: int = 4,
+    leaf: int = 64,
+):
+    with pikepdf.open(io.BytesIO(_draw_pages(pages, lines))) as pdf:
+        if images:
+            _add_images(pdf, images, image_side)
+        add_outline(pdf, outline, depth, leaf)
+        pdf.save(path)
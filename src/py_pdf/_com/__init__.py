@@ -5,6 +5,21 @@ from pathlib import Path
 from typing import Optional, Sequence, TypeVar
 
 from pypdf import PageObject, Transformation
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    RectangleObject,
+    StreamObject,
+)
+
+from .clip import drop_hidden
+from .digest import ObjectDigester
+from .writer import StreamingWriter
 
 T = TypeVar("T")
 
@@ -68,18 +83,20 @@ def sort_from_booklet(pages: Sequence[T]) -> Sequence[T]:
     return right + left[::-1]
 
 
-def merge_two_pages(page1: PageObject, page2: PageObject, vertical: bool) -> PageObject:
+def _layout_boxes(
+    box1: tuple[float, float, float, float],
+    box2: tuple[float, float, float, float],
+    vertical: bool,
+) -> tuple[float, float, Transformation, Transformation]:
     """~~两个页面尺寸应该相同~~
     此处不要求页面尺寸相同，除了大小，还有纸张方向等都不统一。
     因此应该做一个判断。
-    """
-    page1 = copy.deepcopy(page1)
-    page2 = copy.deepcopy(page2)
 
-    width1 = page1.mediabox.width
-    height1 = page1.mediabox.height
-    width2 = page2.mediabox.width
-    height2 = page2.mediabox.height
+    两个页面的 MediaBox 以 (left, bottom, width, height) 给出，
+    返回合并后页面的宽、高，以及两个页面各自的变换。
+    """
+    left1, bottom1, width1, height1 = box1
+    left2, bottom2, width2, height2 = box2
     ROTATION = 90  # 横向纸张应旋转90度（-90度是顺时针旋转，下面的变换也要修改）
 
     w1, h1 = sorted([width1, height1])
@@ -93,57 +110,286 @@ def merge_two_pages(page1: PageObject, page2: PageObject, vertical: bool) -> Pag
         height = max(h1, h2)
 
         if width1 < height1:
-            trans1 = trans1.translate(-page1.mediabox.left, -page1.mediabox.bottom)
+            trans1 = trans1.translate(-left1, -bottom1)
         else:
-            trans1 = trans1.rotate(ROTATION).translate(
-                w1 - page1.mediabox.left, -page1.mediabox.bottom
-            )
+            trans1 = trans1.rotate(ROTATION).translate(w1 - left1, -bottom1)
         if width2 < height2:
-            trans2 = trans2.translate(w2 - page2.mediabox.left, -page2.mediabox.bottom)
+            trans2 = trans2.translate(w2 - left2, -bottom2)
         else:
-            trans2 = trans2.rotate(ROTATION).translate(
-                width - page2.mediabox.left, -page2.mediabox.bottom
-            )
+            trans2 = trans2.rotate(ROTATION).translate(width - left2, -bottom2)
     else:
         width = max(w1, w2)
         height = h1 + h2
 
         if width1 > height1:
-            trans1 = trans1.translate(-page1.mediabox.left, h2 - page1.mediabox.bottom)
+            trans1 = trans1.translate(-left1, h2 - bottom1)
         else:
-            trans1 = trans1.rotate(ROTATION).translate(
-                width - page1.mediabox.left, h2 - page1.mediabox.bottom
-            )
+            trans1 = trans1.rotate(ROTATION).translate(width - left1, h2 - bottom1)
         if width2 > height2:
-            trans2 = trans2.translate(-page2.mediabox.left, -page2.mediabox.bottom)
+            trans2 = trans2.translate(-left2, -bottom2)
         else:
-            trans2 = trans2.rotate(ROTATION).translate(
-                width - page2.mediabox.left, -page2.mediabox.bottom
+            trans2 = trans2.rotate(ROTATION).translate(width - left2, -bottom2)
+
+    return width, height, trans1, trans2
+
+
+def _box(page: PageObject) -> tuple[float, float, float, float]:
+    box = page.mediabox
+    return box.left, box.bottom, box.width, box.height
+
+
+def _layout_two_pages(
+    page1: PageObject, page2: PageObject, vertical: bool
+) -> tuple[float, float, Transformation, Transformation]:
+    return _layout_boxes(_box(page1), _box(page2), vertical)
+
+
+def _pdf_number(value: float) -> str:
+    s = f"{value:.6f}".rstrip("0").rstrip(".")
+    return "0" if s == "-0" else s
+
+
+def is_blank_page(page: PageObject) -> bool:
+    """没有内容流，或内容流只有空白字符的页面。"""
+    if "/Contents" not in page:
+        return True
+    contents = page["/Contents"]
+    if isinstance(contents, StreamObject):
+        contents = [contents]
+    if not isinstance(contents, ArrayObject | list):
+        return True
+    for c in contents:
+        c = c.get_object()
+        # 只解码很短的流，正常页面的内容流不会被解码
+        if len(c._data) > 64 or c.get_data().strip() != b"":
+            return False
+    return True
+
+
+def _links_to_page(annot: DictionaryObject) -> bool:
+    """注释的目标是否是显式的页面引用（/Dest 或 GoTo 动作的 /D）。"""
+    dest = annot["/Dest"] if "/Dest" in annot else None
+    if dest is None and "/A" in annot:
+        action = annot["/A"]
+        if isinstance(action, DictionaryObject) and action.get("/S") == "/GoTo":
+            dest = action["/D"] if "/D" in action else None
+    # 数组元素不会自动解析，页面是间接引用
+    return (
+        isinstance(dest, ArrayObject)
+        and len(dest) > 0
+        and isinstance(dest[0], IndirectObject)
+    )
+
+
+class Imposer:
+    """基于 Form XObject 的拼版。
+
+    每个源页面只包装成一个 Form XObject（内容流原样复制，不解码也不重新编码），
+    输出页面的内容只是若干 `q ... cm /Px Do Q`。资源直接引用来源文档中的对象，
+    由 `StreamingWriter` 写出时去重，共享资源在输出中仍然共享。没有 deepcopy、
+    资源重命名和内容流的重新序列化。
+
+    源页面的注释（链接、表单控件等）复制到输出页面上，/Rect 按放置的变换换算。
+    输出文档没有 /AcroForm，表单控件只保留外观，不再是可填写的表单域。
+
+    空白页面（如补齐用的空白页）不绘制；内容、资源和尺寸完全相同的页面
+    （如重复的封面、分隔页）共用同一个 Form XObject。
+    """
+
+    def __init__(self, writer: StreamingWriter):
+        self.writer = writer
+        # 以 id(page) 为键，同时保存页面本身，防止 id 被复用
+        self.forms = dict[int, tuple[PageObject, Optional[IndirectObject]]]()
+        self.digester = ObjectDigester()
+        self.by_digest = dict[bytes, IndirectObject]()
+
+    def form(self, page: PageObject) -> Optional[IndirectObject]:
+        """返回页面对应的 Form XObject，空白页面返回 `None`。"""
+        if (cached := self.forms.get(id(page))) is not None:
+            return cached[1]
+
+        contents = page["/Contents"] if "/Contents" in page else None
+        if is_blank_page(page):
+            self.forms[id(page)] = (page, None)
+            return None
+
+        key = self.digester.digest(
+            ArrayObject(
+                [
+                    page.get(NameObject("/Contents"), NullObject()),
+                    page.get(NameObject("/Resources"), NullObject()),
+                    page.get(NameObject("/Group"), NullObject()),
+                    page.mediabox,
+                ]
             )
+        )
+        if (ref := self.by_digest.get(key)) is not None:
+            self.forms[id(page)] = (page, ref)
+            return ref
 
-    res = PageObject.create_blank_page(None, width, height)
-    res.merge_transformed_page(page1, trans1)
-    res.merge_transformed_page(page2, trans2)
-    return res
+        if isinstance(contents, StreamObject):
+            # 浅复制，与来源共享未解码的流数据
+            form = copy.copy(contents)
+        else:
+            form = DecodedStreamObject()
+            if isinstance(contents, ArrayObject):
+                form.set_data(b"\n".join(c.get_object().get_data() for c in contents))
+                form = form.flate_encode()
+
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = RectangleObject(page.mediabox)
+        if "/Resources" in page:
+            form[NameObject("/Resources")] = page.raw_get("/Resources")
+        else:
+            form[NameObject("/Resources")] = DictionaryObject()
+        if "/Group" in page:
+            form[NameObject("/Group")] = page.raw_get("/Group")
+
+        ref = self.writer.add_object(form)
+        self.forms[id(page)] = (page, ref)
+        self.by_digest[key] = ref
+        return ref
+
+    def annots(self, page: PageObject, trans: Transformation) -> list[IndirectObject]:
+        """复制页面的注释，按 `trans` 变换 /Rect 和 /QuadPoints。
 
+        注释之间的引用（/Popup、/Parent、/IRT）指向同一页的注释时改为指向副本，
+        否则删除；/P 删除，免得把源页面带进输出。指向本文档页面的链接无法换算
+        到输出页面，不复制。
+        """
+        annots = page["/Annots"] if "/Annots" in page else None
+        if not isinstance(annots, ArrayObject):
+            return []
+        copies = dict[int, DictionaryObject]()
+        refs = dict[int, IndirectObject]()
+        for annot in annots:
+            annot_obj = annot.get_object()
+            if not isinstance(annot_obj, DictionaryObject) or _links_to_page(annot_obj):
+                continue
+            res = DictionaryObject(annot_obj)
+            if "/Rect" in res:
+                left, bottom, right, top = (float(v) for v in res["/Rect"])
+                corners = [
+                    trans.apply_on(pt)
+                    for pt in (
+                        (left, bottom),
+                        (left, top),
+                        (right, bottom),
+                        (right, top),
+                    )
+                ]
+                xs = [x for x, _ in corners]
+                ys = [y for _, y in corners]
+                res[NameObject("/Rect")] = RectangleObject(
+                    [min(xs), min(ys), max(xs), max(ys)]
+                )
+            quad = res["/QuadPoints"] if "/QuadPoints" in res else None
+            if isinstance(quad, ArrayObject):
+                points = list[float]()
+                for i in range(0, len(quad) - 1, 2):
+                    points.extend(trans.apply_on((float(quad[i]), float(quad[i + 1]))))
+                res[NameObject("/QuadPoints")] = ArrayObject(
+                    FloatObject(v) for v in points
+                )
+            res.pop("/P", None)
+            key = id(annot_obj)
+            copies[key] = res
+            refs[key] = self.writer.add_object(res)
 
-def crop_page(page: PageObject, vertical: bool) -> tuple[PageObject, PageObject]:
-    width = page.mediabox.width
-    height = page.mediabox.height
+        by_ref = {
+            (a.idnum, a.generation): id(a.get_object())
+            for a in annots
+            if isinstance(a, IndirectObject)
+        }
+        for res in copies.values():
+            for k in ("/Popup", "/Parent", "/IRT"):
+                if k not in res:
+                    continue
+                target = res.raw_get(k)
+                key = None
+                if isinstance(target, IndirectObject):
+                    key = by_ref.get((target.idnum, target.generation))
+                if key in refs:
+                    res[NameObject(k)] = refs[key]
+                else:
+                    del res[k]
+        return list(refs.values())
 
-    page1 = copy.deepcopy(page)
-    page2 = copy.deepcopy(page)
+    def draw(
+        self,
+        width: float,
+        height: float,
+        placed: list[tuple[PageObject, Transformation]],
+    ) -> PageObject:
+        """创建 `width x height` 的页面，按各自的变换绘制 `placed` 中的页面。"""
+        xobjects = DictionaryObject()
+        ops = list[str]()
+        annots = ArrayObject()
+        for i, (page, trans) in enumerate(placed):
+            annots.extend(self.annots(page, trans))
+            if (form := self.form(page)) is None:
+                continue
+            name = f"/P{i}"
+            xobjects[NameObject(name)] = form
+            ctm = " ".join(map(_pdf_number, trans.ctm))
+            ops.append(f"q {ctm} cm {name} Do Q")
 
+        content = DecodedStreamObject()
+        content.set_data("\n".join(ops).encode())
+
+        res = PageObject.create_blank_page(None, width, height)
+        res[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/XObject"): xobjects}
+        )
+        res[NameObject("/Contents")] = self.writer.add_object(content)
+        if annots:
+            res[NameObject("/Annots")] = annots
+        return res
+
+    def merge_two_pages(
+        self, page1: PageObject, page2: PageObject, vertical: bool
+    ) -> PageObject:
+        width, height, trans1, trans2 = _layout_two_pages(page1, page2, vertical)
+        return self.draw(width, height, [(page1, trans1), (page2, trans2)])
+
+
+def _page_with_mediabox(
+    page: PageObject, left: float, bottom: float, right: float, top: float
+) -> PageObject:
+    """浅复制页面字典，只替换 MediaBox。内容流、资源等仍然引用同一对象。"""
+    res = PageObject()
+    for k in page:
+        res[NameObject(k)] = page.raw_get(k)
+    res[NameObject("/MediaBox")] = RectangleObject([left, bottom, right, top])
+    return res
+
+
+def _half_boxes(
+    left: float, bottom: float, right: float, top: float, vertical: bool
+) -> tuple[tuple[float, float, float, float], tuple[float, float, float, float]]:
+    """把 MediaBox 一分为二，返回前后两个半页的 (left, bottom, right, top)。"""
     # PDF 坐标系原点在左下角，所以y轴向上为正
     # PDF 的页面比较特殊，裁剪结果不是真实的裁剪，而是显示的裁剪。
     # 因此，裁剪方法要设置相对坐标，而非绝对值。
     if vertical:
-        half_width = width / 2
-        page1.mediabox.right -= half_width
-        page2.mediabox.left += half_width
-    else:
-        half_height = height / 2
-        page1.mediabox.bottom += half_height
-        page2.mediabox.top -= half_height
+        middle = left + (right - left) / 2
+        return (left, bottom, middle, top), (middle, bottom, right, top)
+    middle = bottom + (top - bottom) / 2
+    return (left, middle, right, top), (left, bottom, right, middle)
+
+
+def crop_page(
+    page: PageObject, vertical: bool, hard: bool = False
+) -> tuple[PageObject, PageObject]:
+    box = page.mediabox
+    # 两个半页共用原页面的内容流和资源，写出时只保存一份。
+    box1, box2 = _half_boxes(box.left, box.bottom, box.right, box.top, vertical)
+    page1 = _page_with_mediabox(page, *box1)
+    page2 = _page_with_mediabox(page, *box2)
+
+    if hard:
+        # 硬裁剪：删掉半页外的图片，打印时不必再光栅化整张原页
+        drop_hidden(page, (page1, page2))
 
     return page1, page2
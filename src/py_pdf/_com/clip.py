@@ -0,0 +1,133 @@
+from typing import Any, Optional, Sequence
+
+from pypdf import PageObject
+from pypdf.generic import (
+    ContentStream,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+
+Matrix = tuple[float, float, float, float, float, float]
+Bounds = tuple[float, float, float, float]
+
+IDENTITY: Matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+UNIT_SQUARE: Bounds = (0.0, 0.0, 1.0, 1.0)
+
+
+def _multiply(m: Sequence[float], n: Sequence[float]) -> Matrix:
+    """矩阵乘法 m × n，即先做 m 变换，再做 n 变换。"""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + b * c2,
+        a * b2 + b * d2,
+        c * a2 + d * c2,
+        c * b2 + d * d2,
+        e * a2 + f * c2 + e2,
+        e * b2 + f * d2 + f2,
+    )
+
+
+def _bounds(m: Matrix, rect: Bounds) -> Bounds:
+    """矩形经变换后的外接矩形。"""
+    a, b, c, d, e, f = m
+    x0, y0, x1, y1 = rect
+    xs = [a * x + c * y + e for x in (x0, x1) for y in (y0, y1)]
+    ys = [b * x + d * y + f for x in (x0, x1) for y in (y0, y1)]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _xobject_bounds(xobject: Any, ctm: Matrix) -> Optional[Bounds]:
+    subtype = xobject.get("/Subtype")
+    if subtype == "/Image":
+        return _bounds(ctm, UNIT_SQUARE)
+    if subtype == "/Form" and "/BBox" in xobject:
+        x0, y0, x1, y1 = (float(v) for v in xobject["/BBox"])
+        matrix = tuple(float(v) for v in xobject.get("/Matrix", IDENTITY))
+        rect = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        return _bounds(_multiply(matrix, ctm), rect)
+    return None
+
+
+def _placements(
+    operations: list[tuple[Any, bytes]], xobjects: Any
+) -> list[Optional[Bounds]]:
+    """逐个操作计算它在页面上绘制的图片或表单的外接矩形，其它操作为 None。"""
+    ctm = IDENTITY
+    stack = list[Matrix]()
+    res = list[Optional[Bounds]]()
+    for operands, operator in operations:
+        bounds = None
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q":
+            if stack:
+                ctm = stack.pop()
+        elif operator == b"cm":
+            ctm = _multiply([float(v) for v in operands], ctm)
+        elif operator == b"INLINE IMAGE":
+            bounds = _bounds(ctm, UNIT_SQUARE)
+        elif operator == b"Do" and xobjects is not None and operands[0] in xobjects:
+            bounds = _xobject_bounds(xobjects[operands[0]], ctm)
+        res.append(bounds)
+    return res
+
+
+def _outside(bounds: Bounds, box: Bounds) -> bool:
+    x0, y0, x1, y1 = bounds
+    left, bottom, right, top = box
+    return x1 <= left or x0 >= right or y1 <= bottom or y0 >= top
+
+
+def _hidden(placements: Sequence[Optional[Bounds]], box: Bounds) -> set[int]:
+    """完全落在 `box` 之外的操作的下标。"""
+    return {
+        i
+        for i, bounds in enumerate(placements)
+        if bounds is not None and _outside(bounds, box)
+    }
+
+
+def drop_hidden(page: PageObject, halves: Sequence[PageObject]):
+    """真正裁掉每个半页 MediaBox 之外的图片和表单。
+
+    `halves` 是与 `page` 共用内容流的浅复制页面，会被原地修改：
+    完全落在可见区域外的 `Do` 和内联图片被删除，不再使用的 XObject 从资源中去掉。
+    文字和路径仍然保留，它们只是被 MediaBox 遮住。没有可删内容的半页保持与原页面共享。
+
+    跨越半页边界的图片不裁剪也不降采样，两个半页都引用完整的图片。
+    整张扫描的页面只有一张覆盖全页的图片，硬裁剪对它没有效果。
+    """
+    contents = page.get_contents()
+    if contents is None:
+        return
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else None
+    xobjects = resources.get("/XObject") if resources is not None else None
+    xobjects = xobjects.get_object() if xobjects is not None else None
+
+    operations = contents.operations
+    placements = _placements(operations, xobjects)
+
+    for half in halves:
+        hidden = _hidden(placements, tuple(float(v) for v in half.mediabox))
+        if not hidden:
+            continue
+
+        kept = [op for i, op in enumerate(operations) if i not in hidden]
+        content = ContentStream(None, None)
+        content.operations = kept
+        stream = DecodedStreamObject()
+        stream.set_data(content.get_data())
+        half[NameObject("/Contents")] = stream.flate_encode()
+
+        if xobjects is not None:
+            used = {operands[0] for operands, operator in kept if operator == b"Do"}
+            new_resources = DictionaryObject(
+                {NameObject(k): resources.raw_get(k) for k in resources}
+            )
+            new_resources[NameObject("/XObject")] = DictionaryObject(
+                {NameObject(k): xobjects.raw_get(k) for k in xobjects if k in used}
+            )
+            half[NameObject("/Resources")] = new_resources
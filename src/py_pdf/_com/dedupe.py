@@ -0,0 +1,98 @@
+"""pikepdf 文档的结构哈希和流去重。"""
+
+import hashlib
+from typing import Any
+
+import pikepdf
+from pikepdf import Array, Dictionary
+
+
+class PikepdfDigester:
+    """pikepdf 对象的结构哈希，与 `ObjectDigester` 相同：间接引用按被引用对象的
+    内容计算，流按未解码的原始数据计算。
+    """
+
+    def __init__(self):
+        self.memo = dict[tuple[int, int], bytes]()
+
+    def _ref(self, obj: pikepdf.Object) -> bytes:
+        key = obj.objgen
+        if (res := self.memo.get(key)) is not None:
+            return res
+        # 先用对象号占位，遇到循环引用时退化为按引用比较
+        self.memo[key] = repr(key).encode()
+        h = hashlib.blake2b(digest_size=16)
+        self._feed(h, obj, top=True)
+        self.memo[key] = res = h.digest()
+        return res
+
+    def _feed(self, h: "hashlib._Hash", obj: Any, top: bool = False):
+        if not top and isinstance(obj, pikepdf.Object) and obj.is_indirect:
+            h.update(b"R")
+            h.update(self._ref(obj))
+        elif isinstance(obj, pikepdf.Stream):
+            self._feed(h, obj.stream_dict)
+            h.update(b"stream")
+            h.update(obj.read_raw_bytes())
+        elif isinstance(obj, Dictionary):
+            h.update(b"<<")
+            for k in sorted(obj.keys()):
+                if k == "/Length":
+                    continue
+                h.update(k.encode())
+                self._feed(h, obj[k])
+            h.update(b">>")
+        elif isinstance(obj, Array):
+            h.update(b"[")
+            for v in obj:
+                self._feed(h, v)
+            h.update(b"]")
+        elif isinstance(obj, pikepdf.Object):
+            h.update(obj.unparse())
+        else:
+            # 数字、布尔值等被 pikepdf 转换为 Python 对象
+            h.update(type(obj).__name__.encode())
+            h.update(repr(obj).encode())
+
+    def digest(self, obj: Any) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        self._feed(h, obj)
+        return h.digest()
+
+
+def dedupe_streams(pdf: pikepdf.Pdf):
+    """合并内容相同的流：其它对象中对重复流的引用都改为指向第一份。
+    不再被引用的副本写出时被 qpdf 丢弃。
+    """
+    digester = PikepdfDigester()
+    canonical = dict[bytes, pikepdf.Object]()
+    replace = dict[tuple[int, int], pikepdf.Object]()
+    for obj in pdf.objects:
+        if isinstance(obj, pikepdf.Stream):
+            first = canonical.setdefault(digester.digest(obj), obj)
+            if first.objgen != obj.objgen:
+                replace[obj.objgen] = first
+    if not replace:
+        return
+
+    def update(container: Any):
+        if isinstance(container, pikepdf.Stream):
+            container = container.stream_dict
+        if isinstance(container, Dictionary):
+            items = [(k, container[k]) for k in container.keys()]
+        elif isinstance(container, Array):
+            items = list(enumerate(container))
+        else:
+            return
+        for k, v in items:
+            if not isinstance(v, pikepdf.Object):
+                continue
+            if v.is_indirect:
+                if (new := replace.get(v.objgen)) is not None:
+                    container[k] = new
+            else:
+                update(v)
+
+    for obj in pdf.objects:
+        update(obj)
+    update(pdf.trailer)
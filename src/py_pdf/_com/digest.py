@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any
+
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    StreamObject,
+)
+
+
+class ObjectDigester:
+    """计算 PDF 对象的结构哈希。
+
+    间接引用按被引用对象的内容计算，而不是按对象号，因此内容相同但对象不同的
+    两份副本（如重复插入的封面、分隔页）得到相同的摘要。流按未解码的原始数据计算。
+    已计算过的间接对象会被缓存，共享的字体、图片等只计算一次。
+    """
+
+    def __init__(self):
+        self.memo = dict[tuple[int, int, int], bytes]()
+
+    def _ref(self, ref: IndirectObject) -> bytes:
+        key = (id(ref.pdf), ref.idnum, ref.generation)
+        if (res := self.memo.get(key)) is not None:
+            return res
+        # 先用对象号占位，遇到循环引用时退化为按引用比较
+        self.memo[key] = repr(key).encode()
+        res = self.digest(ref.get_object())
+        self.memo[key] = res
+        return res
+
+    def _feed(self, h: "hashlib._Hash", obj: Any):
+        if isinstance(obj, IndirectObject):
+            h.update(b"R")
+            h.update(self._ref(obj))
+        elif isinstance(obj, DictionaryObject):
+            h.update(b"<<")
+            for k in sorted(obj):
+                if k == "/Length":
+                    continue
+                h.update(k.encode())
+                self._feed(h, obj.raw_get(k))
+            h.update(b">>")
+            if isinstance(obj, StreamObject):
+                h.update(b"stream")
+                h.update(obj._data)
+        elif isinstance(obj, ArrayObject):
+            h.update(b"[")
+            for v in obj:
+                self._feed(h, v)
+            h.update(b"]")
+        else:
+            h.update(type(obj).__name__.encode())
+            h.update(repr(obj).encode())
+
+    def digest(self, obj: Any) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        self._feed(h, obj)
+        return h.digest()
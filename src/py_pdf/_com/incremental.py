@@ -0,0 +1,181 @@
+"""增量更新（incremental update）写出。
+
+原文件的字节原样复制到输出文件，之后只追加修改过的对象、新对象和一个新的
+交叉引用段，新段用 /Prev 指向原来的交叉引用。写出量只与修改的大小有关。
+
+pikepdf 只在 `save_incremental` 中按需导入，`StreamingWriter` 不会加载它。
+"""
+
+import os
+import re
+import shutil
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterable
+
+if TYPE_CHECKING:
+    import pikepdf
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+
+def copy_file(src: BinaryIO, dst: BinaryIO):
+    """复制整个文件，尽量交给内核完成（支持的文件系统上是 reflink）。"""
+    src.seek(0)
+    dst.flush()
+    try:
+        size = os.fstat(src.fileno()).st_size
+        done = 0
+        while done < size:
+            n = os.copy_file_range(src.fileno(), dst.fileno(), size - done)
+            if n == 0:
+                break
+            done += n
+        dst.seek(0, os.SEEK_END)
+        if done == size:
+            return
+    except (AttributeError, OSError):
+        pass
+    # 不支持 copy_file_range 的平台或文件，从头复制
+    src.seek(0)
+    dst.seek(0)
+    dst.truncate()
+    shutil.copyfileobj(src, dst, 1 << 20)
+
+
+def last_xref(fp: BinaryIO) -> tuple[int, bool]:
+    """返回最后一个交叉引用段的偏移量，以及它是否是交叉引用流。"""
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell()
+    fp.seek(max(0, size - 1024))
+    matches = _STARTXREF.findall(fp.read())
+    if not matches:
+        raise ValueError("startxref not found")
+    offset = int(matches[-1])
+    fp.seek(offset)
+    is_stream = not fp.read(32).lstrip().startswith(b"xref")
+    return offset, is_stream
+
+
+def _runs(nums: list[int]) -> Iterable[tuple[int, int]]:
+    """把排好序的对象号分成连续的段 (起始号, 个数)。"""
+    if not nums:
+        return
+    start = prev = nums[0]
+    for num in nums[1:]:
+        if num != prev + 1:
+            yield start, prev - start + 1
+            start = num
+        prev = num
+    yield start, prev - start + 1
+
+
+def write_xref(
+    fp: BinaryIO,
+    offsets: dict[int, tuple[int, int]],
+    size: int,
+    trailer: dict[str, bytes],
+    use_stream: bool,
+):
+    """写出增量交叉引用段和文件尾。
+
+    `offsets` 是对象号到 (偏移量, 代数) 的映射，`trailer` 的值是已经序列化的
+    PDF 对象（如 `b"1 0 R"`），其中应包含 /Root 和 /Prev。
+    原文件使用交叉引用流时，新段也写成交叉引用流。
+    """
+    nums = sorted(offsets)
+    xref = fp.tell()
+    if use_stream:
+        # 交叉引用流自己也需要一个对象号
+        offsets = dict(offsets)
+        offsets[size] = (xref, 0)
+        nums.append(size)
+        size += 1
+        rows = b"".join(
+            struct.pack(">BQH", 1, offsets[num][0], offsets[num][1]) for num in nums
+        )
+        data = zlib.compress(rows)
+        index = b" ".join(b"%d %d" % run for run in _runs(nums))
+        entries = b"".join(
+            b"/%s %s " % (k.lstrip("/").encode(), v) for k, v in trailer.items()
+        )
+        fp.write(
+            b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 8 2] /Index [%s] %s"
+            b"/Filter /FlateDecode /Length %d >>\nstream\n"
+            % (size - 1, size, index, entries, len(data))
+        )
+        fp.write(data)
+        fp.write(b"\nendstream\nendobj\n")
+    else:
+        fp.write(b"xref\n")
+        for start, count in _runs(nums):
+            fp.write(b"%d %d\n" % (start, count))
+            for num in range(start, start + count):
+                offset, gen = offsets[num]
+                fp.write(b"%010d %05d n \n" % (offset, gen))
+        entries = b"".join(
+            b"/%s %s " % (k.lstrip("/").encode(), v) for k, v in trailer.items()
+        )
+        fp.write(b"trailer\n<< /Size %d %s>>\n" % (size, entries))
+    fp.write(b"startxref\n%d\n%%%%EOF\n" % xref)
+
+
+def _serialize(obj: "pikepdf.Object") -> bytes:
+    import pikepdf
+
+    if isinstance(obj, pikepdf.Stream):
+        data = obj.read_raw_bytes()
+        stream_dict = pikepdf.Dictionary(obj.stream_dict)
+        stream_dict.Length = len(data)
+        return stream_dict.unparse() + b"\nstream\n" + data + b"\nendstream"
+    return obj.unparse(resolved=True)
+
+
+def object_ids(pdf: "pikepdf.Pdf") -> set[tuple[int, int]]:
+    """文件中现有间接对象的 (对象号, 代数)。对象号可以不连续。"""
+    return {obj.objgen for obj in pdf.objects if obj is not None}
+
+
+def save_incremental(
+    pdf: "pikepdf.Pdf",
+    input_path: Path | str,
+    output_path: Path | str,
+    base_ids: set[tuple[int, int]],
+    changed: Iterable["pikepdf.Object"],
+):
+    """把 pikepdf 中的修改以增量更新的方式保存。
+
+    `base_ids` 是修改前的 `object_ids(pdf)`，不在其中的间接对象（`make_indirect`
+    创建的）都会被写出；`changed` 是被修改的原有间接对象。
+    """
+    if pdf.is_encrypted:
+        raise ValueError("incremental update of encrypted PDF is not supported")
+
+    objects = {obj.objgen: obj for obj in changed}
+    size = int(pdf.trailer.Size)
+    for obj in pdf.objects:
+        if obj is None:
+            continue
+        size = max(size, obj.objgen[0] + 1)
+        if obj.objgen not in base_ids:
+            objects[obj.objgen] = obj
+
+    with open(input_path, "rb") as src, open(output_path, "wb+") as fp:
+        prev, use_stream = last_xref(src)
+        copy_file(src, fp)
+        fp.write(b"\n")
+
+        offsets = dict[int, tuple[int, int]]()
+        for (num, gen), obj in sorted(objects.items()):
+            offsets[num] = (fp.tell(), gen)
+            fp.write(b"%d %d obj\n" % (num, gen))
+            fp.write(_serialize(obj))
+            fp.write(b"\nendobj\n")
+
+        trailer = {"/Root": pdf.Root.unparse(), "/Prev": b"%d" % prev}
+        if "/Info" in pdf.trailer:
+            trailer["/Info"] = pdf.trailer.Info.unparse()
+        if "/ID" in pdf.trailer:
+            trailer["/ID"] = pdf.trailer.ID.unparse(resolved=True)
+        write_xref(fp, offsets, size, trailer, use_stream)
@@ -0,0 +1,543 @@
+"""轻量页数统计。
+
+只读取 trailer、交叉引用表/流以及根 `/Pages` 字典中的 `/Count`，
+不展开页面树。通常只需要几次小范围的 seek 和 read。
+
+无法处理的文件（损坏、加密的对象流、不支持的过滤器、页面树不一致等）
+抛出 `PageCountError`，调用方应回退到 `pypdf.PdfReader`。
+"""
+
+import re
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Optional
+
+_WHITESPACE = b"\x00\t\n\x0c\r "
+_DELIMITERS = b"()<>[]{}/%"
+_TAIL_SIZE = 2048
+_CHUNK_SIZE = 4096
+_MAX_OBJECT_SIZE = 1 << 24
+
+_NUMBER = re.compile(rb"[+-]?(\d+\.?\d*|\.\d+)")
+_REFERENCE = re.compile(rb"(\d+)\s+(\d+)\s+R(?=[\s/\[\]<>()%])")
+_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])[\r\n ][\r\n]")
+
+
+class PageCountError(ValueError):
+    pass
+
+
+class _Incomplete(PageCountError):
+    """数据块不足以解析完整对象，需要读取更多字节。"""
+
+
+@dataclass(frozen=True)
+class Ref:
+    num: int
+    gen: int
+
+
+class _Parser:
+    """PDF 对象的最小解析器，只支持统计页数需要的语法。
+
+    名称解析为以 `/` 开头的 `str`，字符串解析为 `bytes`，间接引用解析为 `Ref`。
+    """
+
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def skip_ws(self):
+        data = self.data
+        while self.pos < len(data):
+            c = data[self.pos]
+            if c in _WHITESPACE:
+                self.pos += 1
+            elif c == 0x25:  # %
+                end = data.find(b"\n", self.pos)
+                if end < 0:
+                    raise _Incomplete
+                self.pos = end + 1
+            else:
+                return
+        raise _Incomplete
+
+    def keyword(self) -> bytes:
+        self.skip_ws()
+        start = self.pos
+        data = self.data
+        while self.pos < len(data) and data[self.pos] not in _WHITESPACE + _DELIMITERS:
+            self.pos += 1
+        if self.pos == len(data):
+            raise _Incomplete
+        return data[start : self.pos]
+
+    def expect(self, word: bytes):
+        if self.keyword() != word:
+            raise PageCountError(f"expected {word!r} at {self.pos}")
+
+    def parse(self) -> Any:
+        self.skip_ws()
+        data = self.data
+        c = data[self.pos : self.pos + 1]
+        if c == b"/":
+            return self._name()
+        if c == b"(":
+            return self._literal_string()
+        if c == b"[":
+            self.pos += 1
+            res = []
+            while True:
+                self.skip_ws()
+                if data[self.pos : self.pos + 1] == b"]":
+                    self.pos += 1
+                    return res
+                # 扁平页面树的 /Kids 可能有上万个引用，用正则快速匹配
+                if m := _REFERENCE.match(data, self.pos):
+                    res.append(Ref(int(m[1]), int(m[2])))
+                    self.pos = m.end()
+                    continue
+                res.append(self.parse())
+        if c == b"<":
+            if data[self.pos + 1 : self.pos + 2] == b"<":
+                return self._dictionary()
+            return self._hex_string()
+
+        word = self.keyword()
+        if word == b"true":
+            return True
+        if word == b"false":
+            return False
+        if word == b"null":
+            return None
+        if _NUMBER.fullmatch(word) is None:
+            raise PageCountError(f"unexpected token {word!r}")
+        if b"." in word:
+            return float(word)
+        num = int(word)
+
+        # 尝试解析间接引用 `num gen R`
+        saved = self.pos
+        try:
+            gen = self.keyword()
+            if gen.isdigit() and self.keyword() == b"R":
+                return Ref(num, int(gen))
+        except _Incomplete:
+            # 数据块恰好在数字之后结束，无法判断是否为引用
+            raise
+        except PageCountError:
+            pass
+        self.pos = saved
+        return num
+
+    def _name(self) -> str:
+        self.pos += 1
+        if self.pos >= len(self.data):
+            raise _Incomplete
+        word = self.keyword() if self.data[self.pos] not in _DELIMITERS else b""
+        name = re.sub(
+            rb"#([0-9A-Fa-f]{2})", lambda m: bytes.fromhex(m[1].decode()), word
+        )
+        return "/" + name.decode("latin-1")
+
+    def _dictionary(self) -> dict[str, Any]:
+        self.pos += 2
+        res = dict[str, Any]()
+        while True:
+            self.skip_ws()
+            if self.data[self.pos : self.pos + 2] == b">>":
+                self.pos += 2
+                return res
+            key = self.parse()
+            if not isinstance(key, str):
+                raise PageCountError(f"invalid dictionary key {key!r}")
+            res[key] = self.parse()
+
+    def _hex_string(self) -> bytes:
+        end = self.data.find(b">", self.pos)
+        if end < 0:
+            raise _Incomplete
+        digits = re.sub(rb"\s", b"", self.data[self.pos + 1 : end])
+        self.pos = end + 1
+        if len(digits) % 2:
+            digits += b"0"
+        return bytes.fromhex(digits.decode("latin-1"))
+
+    def _literal_string(self) -> bytes:
+        # 页数统计不关心字符串内容，只需要正确跳过转义和嵌套括号
+        data = self.data
+        depth = 0
+        start = self.pos
+        while self.pos < len(data):
+            c = data[self.pos]
+            if c == 0x5C:  # \
+                self.pos += 2
+                continue
+            if c == 0x28:  # (
+                depth += 1
+            elif c == 0x29:  # )
+                depth -= 1
+                if depth == 0:
+                    self.pos += 1
+                    return data[start + 1 : self.pos - 1]
+            self.pos += 1
+        raise _Incomplete
+
+
+def _png_unpredict(data: bytes, columns: int, bpp: int) -> bytes:
+    row_size = columns + 1
+    if len(data) % row_size:
+        raise PageCountError("invalid predictor data")
+    prev = bytearray(columns)
+    out = bytearray()
+    for i in range(0, len(data), row_size):
+        kind = data[i]
+        row = bytearray(data[i + 1 : i + row_size])
+        for j in range(columns):
+            left = row[j - bpp] if j >= bpp else 0
+            up = prev[j]
+            if kind == 0:
+                break
+            elif kind == 1:
+                row[j] = (row[j] + left) & 0xFF
+            elif kind == 2:
+                row[j] = (row[j] + up) & 0xFF
+            elif kind == 3:
+                row[j] = (row[j] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                up_left = prev[j - bpp] if j >= bpp else 0
+                p = left + up - up_left
+                pa, pb, pc = abs(p - left), abs(p - up), abs(p - up_left)
+                if pa <= pb and pa <= pc:
+                    pred = left
+                elif pb <= pc:
+                    pred = up
+                else:
+                    pred = up_left
+                row[j] = (row[j] + pred) & 0xFF
+            else:
+                raise PageCountError(f"unknown PNG predictor {kind}")
+        out += row
+        prev = row
+    return bytes(out)
+
+
+def _inflate(
+    stream_dict: dict[str, Any], data: bytes
+) -> tuple[bytes, Optional[tuple[int, int]]]:
+    """解压流数据，返回数据和 PNG 预测器参数 `(columns, bpp)`（未使用时为 `None`）。"""
+    filters = stream_dict.get("/Filter")
+    params = stream_dict.get("/DecodeParms")
+    if filters is None:
+        return data, None
+    if isinstance(filters, list):
+        if len(filters) != 1:
+            raise PageCountError(f"unsupported filters {filters}")
+        filters = filters[0]
+        if isinstance(params, list):
+            params = params[0]
+    if filters != "/FlateDecode":
+        raise PageCountError(f"unsupported filter {filters}")
+
+    data = zlib.decompress(data)
+    if not isinstance(params, dict):
+        return data, None
+    predictor = params.get("/Predictor", 1)
+    if predictor == 1:
+        return data, None
+    if predictor < 10:
+        raise PageCountError(f"unsupported predictor {predictor}")
+    colors = params.get("/Colors", 1)
+    bits = params.get("/BitsPerComponent", 8)
+    columns = params.get("/Columns", 1)
+    return data, (columns * colors * bits // 8, max(1, colors * bits // 8))
+
+
+def _decode_stream(stream_dict: dict[str, Any], data: bytes) -> bytes:
+    data, predictor = _inflate(stream_dict, data)
+    if predictor is None:
+        return data
+    return _png_unpredict(data, *predictor)
+
+
+class _XRefSection(ABC):
+    """一个交叉引用段。`lookup` 返回
+    `("n", offset)`、`("c", objstm_num, index)`、`("f",)` 或 `None`（不在本段）。
+    """
+
+    trailer: dict[str, Any]
+
+    @abstractmethod
+    def lookup(self, num: int) -> Optional[tuple]: ...
+
+
+class _XRefTable(_XRefSection):
+    def __init__(self, doc: "_Document", pos: int):
+        self.f = doc.f
+        self.subsections = list[tuple[int, int, int]]()
+
+        chunk = doc.read_at(pos, _CHUNK_SIZE)
+        parser = _Parser(chunk)
+        parser.expect(b"xref")
+        while True:
+            parser.skip_ws()
+            if chunk.startswith(b"trailer", parser.pos):
+                parser.pos += len(b"trailer")
+                break
+            start = int(parser.keyword())
+            count = int(parser.keyword())
+            parser.skip_ws()
+            entries_pos = pos + parser.pos
+            self.subsections.append((start, count, entries_pos))
+            # 表项固定 20 字节，跳过本小节后重新读取
+            pos = entries_pos + count * 20
+            chunk = doc.read_at(pos, _CHUNK_SIZE)
+            parser = _Parser(chunk)
+
+        self.trailer = doc.parse_at(pos + parser.pos, _Parser.parse)
+        if not isinstance(self.trailer, dict):
+            raise PageCountError("invalid trailer")
+
+    def lookup(self, num: int) -> Optional[tuple]:
+        for start, count, entries_pos in self.subsections:
+            if start <= num < start + count:
+                self.f.seek(entries_pos + (num - start) * 20)
+                m = _XREF_ENTRY.fullmatch(self.f.read(20))
+                if m is None:
+                    raise PageCountError("invalid xref entry")
+                if m[3] == b"f":
+                    return ("f",)
+                return ("n", int(m[1]))
+        return None
+
+
+class _XRefStream(_XRefSection):
+    def __init__(self, doc: "_Document", pos: int):
+        _, self.trailer, data = doc.parse_object_at(pos)
+        if self.trailer.get("/Type") != "/XRef" or data is None:
+            raise PageCountError("invalid xref stream")
+        self.widths: list[int] = self.trailer["/W"]
+        self.row_size = sum(self.widths)
+        index = self.trailer.get("/Index", [0, self.trailer["/Size"]])
+        self.subsections = list(zip(index[::2], index[1::2]))
+
+        self.data, predictor = _inflate(self.trailer, data)
+        # 交叉引用流几乎都只用 PNG Up 预测器，此时第 r 行的每个字节等于
+        # 前 r 行对应字节之和，可以只计算查找到的行，而不必解码整个流
+        self.up_only = False
+        if predictor is not None:
+            columns, _ = predictor
+            if columns != self.row_size:
+                raise PageCountError("xref stream /Columns does not match /W")
+            if self.data[:: columns + 1].strip(b"\x02"):
+                self.data = _png_unpredict(self.data, *predictor)
+            else:
+                self.up_only = True
+
+    def _row(self, row: int) -> bytes:
+        size = self.row_size
+        if not self.up_only:
+            res = self.data[row * size : (row + 1) * size]
+        else:
+            end = (row + 1) * (size + 1)
+            if end > len(self.data):
+                raise PageCountError("xref stream too short")
+            res = bytes(
+                sum(self.data[j + 1 : end : size + 1]) & 0xFF for j in range(size)
+            )
+        if len(res) != size:
+            raise PageCountError("xref stream too short")
+        return res
+
+    def _field(self, row: bytes, i: int, default: int) -> int:
+        width = self.widths[i]
+        if width == 0:
+            return default
+        start = sum(self.widths[:i])
+        return int.from_bytes(row[start : start + width], "big")
+
+    def lookup(self, num: int) -> Optional[tuple]:
+        base = 0
+        for start, count in self.subsections:
+            if start <= num < start + count:
+                row = self._row(base + num - start)
+                kind = self._field(row, 0, 1)
+                if kind == 1:
+                    return ("n", self._field(row, 1, 0))
+                if kind == 2:
+                    return ("c", self._field(row, 1, 0), self._field(row, 2, 0))
+                return ("f",)
+            base += count
+        return None
+
+
+class _Document:
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.size = f.seek(0, 2)
+        self.cache = dict[int, Any]()
+        self.objstm_cache = dict[int, tuple[bytes, dict[int, int]]]()
+
+        tail = self.read_at(max(0, self.size - _TAIL_SIZE), _TAIL_SIZE)
+        i = tail.rfind(b"startxref")
+        if i < 0:
+            raise PageCountError("startxref not found")
+        parser = _Parser(tail + b"\n", i + len(b"startxref"))
+        self.sections = list[_XRefSection]()
+        self.pending = [int(parser.keyword())]
+        self.visited = set[int]()
+        self.trailer = self._next_section().trailer
+
+    def read_at(self, pos: int, size: int) -> bytes:
+        if not 0 <= pos < self.size:
+            raise PageCountError(f"offset {pos} out of range")
+        self.f.seek(pos)
+        return self.f.read(size)
+
+    def parse_at(self, pos: int, func):
+        """从 `pos` 开始读取数据块并调用 `func(parser)`，数据不足时加倍读取。"""
+        size = _CHUNK_SIZE
+        while True:
+            chunk = self.read_at(pos, size)
+            try:
+                return func(_Parser(chunk))
+            except _Incomplete:
+                if len(chunk) < size or size >= _MAX_OBJECT_SIZE:
+                    raise PageCountError(f"truncated object at {pos}")
+                size *= 4
+
+    def parse_object_at(self, pos: int) -> tuple[int, Any, Optional[bytes]]:
+        """解析 `num gen obj ... endobj`，返回对象号、对象和流数据（如有）。"""
+
+        def header(parser: _Parser):
+            num = int(parser.keyword())
+            parser.keyword()
+            parser.expect(b"obj")
+            value = parser.parse()
+            parser.skip_ws()
+            if not parser.data.startswith(b"stream", parser.pos):
+                return num, value, None
+            parser.pos += len(b"stream")
+            if parser.data.startswith(b"\r\n", parser.pos):
+                parser.pos += 2
+            elif parser.data.startswith(b"\n", parser.pos):
+                parser.pos += 1
+            return num, value, parser.pos
+
+        num, value, data_pos = self.parse_at(pos, header)
+        if data_pos is None:
+            return num, value, None
+
+        length = value.get("/Length")
+        if isinstance(length, Ref):
+            # 交叉引用流字典中只有直接对象，不会走到这里
+            length = self.resolve(length)
+        if not isinstance(length, int) or length < 0:
+            raise PageCountError("invalid stream length")
+        data = self.read_at(pos + data_pos, length)
+        if len(data) != length:
+            raise PageCountError("truncated stream")
+        return num, value, data
+
+    def _next_section(self) -> _XRefSection:
+        pos = self.pending.pop(0)
+        self.visited.add(pos)
+
+        head = self.read_at(pos, 16).lstrip(_WHITESPACE)
+        if head.startswith(b"xref"):
+            section = _XRefTable(self, pos)
+        else:
+            section = _XRefStream(self, pos)
+        self.sections.append(section)
+
+        # 混合引用文件：/XRefStm 优先于 /Prev
+        trailer = section.trailer
+        for key in ("/XRefStm", "/Prev"):
+            value = trailer.get(key)
+            if not isinstance(value, int) or value in self.visited:
+                continue
+            if value not in self.pending:
+                self.pending.append(value)
+        return section
+
+    def lookup(self, num: int) -> tuple:
+        for section in self.sections:
+            if (entry := section.lookup(num)) is not None:
+                return entry
+        while self.pending:
+            if (entry := self._next_section().lookup(num)) is not None:
+                return entry
+        raise PageCountError(f"object {num} not found")
+
+    def _object_stream(self, num: int) -> tuple[bytes, dict[int, int]]:
+        if num in self.objstm_cache:
+            return self.objstm_cache[num]
+        if "/Encrypt" in self.trailer:
+            raise PageCountError("encrypted object stream")
+        entry = self.lookup(num)
+        if entry[0] != "n":
+            raise PageCountError(f"invalid object stream {num}")
+        _, stream_dict, data = self.parse_object_at(entry[1])
+        if data is None:
+            raise PageCountError(f"object {num} is not a stream")
+        data = _decode_stream(stream_dict, data)
+        first = stream_dict["/First"]
+        parser = _Parser(data[:first] + b" ")
+        offsets = dict[int, int]()
+        for _ in range(stream_dict["/N"]):
+            obj_num = int(parser.keyword())
+            offsets[obj_num] = first + int(parser.keyword())
+        self.objstm_cache[num] = data, offsets
+        return data, offsets
+
+    def resolve(self, obj: Any) -> Any:
+        if not isinstance(obj, Ref):
+            return obj
+        if obj.num in self.cache:
+            return self.cache[obj.num]
+
+        entry = self.lookup(obj.num)
+        if entry[0] == "n":
+            num, value, _ = self.parse_object_at(entry[1])
+            if num != obj.num:
+                raise PageCountError(f"xref points to object {num}, not {obj.num}")
+        elif entry[0] == "c":
+            data, offsets = self._object_stream(entry[1])
+            if obj.num not in offsets:
+                raise PageCountError(f"object {obj.num} not in object stream")
+            value = _Parser(data + b"\nendobj\n", offsets[obj.num]).parse()
+        else:
+            value = None
+
+        self.cache[obj.num] = value
+        return value
+
+
+def count_pages(path: Path | str) -> int:
+    """返回根 `/Pages` 节点的 `/Count`。
+
+    仅做廉价的一致性检查：`/Count` 为非负整数，`/Kids` 数目不超过 `/Count`。
+    """
+    try:
+        with open(path, "rb") as f:
+            doc = _Document(f)
+            root = doc.resolve(doc.trailer.get("/Root"))
+            pages = doc.resolve(root["/Pages"])
+            if pages.get("/Type", "/Pages") != "/Pages":
+                raise PageCountError("root /Pages is not a page tree node")
+            count = doc.resolve(pages.get("/Count"))
+            kids = doc.resolve(pages.get("/Kids"))
+    except PageCountError:
+        raise
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+        raise PageCountError(f"{type(e).__name__}: {e}") from e
+    except zlib.error as e:
+        raise PageCountError(f"zlib: {e}") from e
+
+    if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+        raise PageCountError(f"invalid /Count {count!r}")
+    if not isinstance(kids, list) or len(kids) > count or (count > 0 and not kids):
+        raise PageCountError("inconsistent page tree")
+    return count
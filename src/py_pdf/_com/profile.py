@@ -0,0 +1,103 @@
+"""输出配置（profile）。
+
+`StreamingWriter` 边生成边写出，不能生成对象流或线性化文件。需要时在写出后
+用 pikepdf（qpdf）重写一遍输出文件。直接用 pikepdf 生成的文档由 `save` 保存，
+去重也在其中完成。
+
+pikepdf 只在需要时导入，只用 `StreamingWriter` 的工具启动时不必加载它。
+"""
+
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import pikepdf
+
+
+@dataclass(frozen=True)
+class OutputProfile:
+    """
+    `object_streams`: 把非流对象打包进压缩的对象流
+    `compression_level`: 以该 Flate 级别（0-9）重新压缩所有流，`None` 表示不重新压缩
+    `linearize`: 线性化（快速 Web 查看），阅读器可以在下载完成前显示第一页
+    `dedupe`: 合并来源中内容相同的流
+    """
+
+    object_streams: bool = False
+    compression_level: Optional[int] = None
+    linearize: bool = False
+    dedupe: bool = False
+
+    @property
+    def rewrite(self) -> bool:
+        """是否需要用 pikepdf 重写输出文件。"""
+        return (
+            self.object_streams or self.compression_level is not None or self.linearize
+        )
+
+    def save_options(self) -> dict[str, Any]:
+        """`pikepdf.Pdf.save` 的参数。"""
+        import pikepdf
+
+        return dict(
+            object_stream_mode=(
+                pikepdf.ObjectStreamMode.generate
+                if self.object_streams
+                else pikepdf.ObjectStreamMode.preserve
+            ),
+            compress_streams=True,
+            recompress_flate=self.compression_level is not None,
+            linearize=self.linearize,
+        )
+
+
+PROFILES = {
+    # 直接流式写出，最快
+    "fast": OutputProfile(),
+    # 体积最小
+    "compact": OutputProfile(object_streams=True, compression_level=9, dedupe=True),
+    # 网页发布：线性化，同时压缩
+    "web": OutputProfile(object_streams=True, linearize=True, dedupe=True),
+}
+DEFAULT_PROFILE = PROFILES["fast"]
+
+
+def get_profile(profile: str | OutputProfile) -> OutputProfile:
+    if isinstance(profile, OutputProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"unknown output profile: {profile}") from None
+
+
+def save(pdf: "pikepdf.Pdf", path: Path | str, profile: OutputProfile):
+    """按 `profile` 保存 pikepdf 文档。`profile.dedupe` 为真时先合并内容相同的流。"""
+    import pikepdf
+
+    from .dedupe import dedupe_streams
+
+    if profile.dedupe:
+        dedupe_streams(pdf)
+    if profile.compression_level is None:
+        pdf.save(path, **profile.save_options())
+        return
+    pikepdf.settings.set_flate_compression_level(profile.compression_level)
+    try:
+        pdf.save(path, **profile.save_options())
+    finally:
+        # -1 是 zlib 的默认级别
+        pikepdf.settings.set_flate_compression_level(-1)
+
+
+def finish(path: Path | str, profile: OutputProfile):
+    """按 `profile` 重写 `StreamingWriter` 写出的文件，不需要时什么也不做。"""
+    if not profile.rewrite:
+        return
+    import pikepdf
+
+    with pikepdf.open(path, allow_overwriting_input=True) as pdf:
+        # `StreamingWriter` 写出时已经去重
+        save(pdf, path, dataclasses.replace(profile, dedupe=False))
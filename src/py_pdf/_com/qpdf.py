@@ -0,0 +1,292 @@
+"""基于 pikepdf（qpdf）的拼版后端。
+
+结果与 `Imposer` 和 `crop_page` 相同：合并时每个源页面包装成一个 Form XObject，
+按 `_layout_boxes` 的变换绘制，内容相同的页面共用一个 Form XObject，注释按同样
+的规则复制；分割时两个半页共用原页面的内容和资源，只替换 MediaBox，
+硬裁剪时按 `clip.drop_hidden` 的规则删去半页外的图片和表单。
+解析、复制对象和写出都在 qpdf 的 C++ 代码中完成。
+"""
+
+from pathlib import Path
+from typing import Optional
+
+import pikepdf
+from pikepdf import Array, Dictionary, Name
+from pypdf import Transformation
+
+from . import (
+    _half_boxes,
+    _layout_boxes,
+    _pdf_number,
+    sort_from_booklet,
+    sort_to_booklet,
+)
+from .clip import _hidden, _placements
+from .dedupe import PikepdfDigester
+from .profile import DEFAULT_PROFILE, OutputProfile, save
+
+BACKENDS = ("pypdf", "pikepdf")
+
+
+def _box(page: pikepdf.Page) -> tuple[float, float, float, float]:
+    left, bottom, right, top = (float(x) for x in page.mediabox)
+    return min(left, right), min(bottom, top), abs(right - left), abs(top - bottom)
+
+
+def _is_blank(page: pikepdf.Page) -> bool:
+    """没有内容流，或内容流只有空白字符的页面。"""
+    contents = page.obj.get(Name.Contents)
+    if isinstance(contents, pikepdf.Stream):
+        contents = [contents]
+    if not isinstance(contents, Array | list):
+        return True
+    for c in contents:
+        # 只解码很短的流，正常页面的内容流不会被解码
+        if len(c.read_raw_bytes()) > 64 or c.read_bytes().strip() != b"":
+            return False
+    return True
+
+
+def _set_pages(out: pikepdf.Pdf, pages: list[Dictionary]):
+    """直接写入新文档的页面树。逐页 `pages.append` 每次都要遍历页面树，是平方复杂度。"""
+    tree = out.Root.Pages
+    kids = Array()
+    for page in pages:
+        page.Type = Name.Page
+        page.Parent = tree
+        kids.append(out.make_indirect(page))
+    tree.Kids = kids
+    tree.Count = len(kids)
+
+
+class _Forms:
+    """每个源页面只转换、复制一次 Form XObject，空白页面为 `None`。
+    内容、资源和尺寸完全相同的页面共用同一个 Form XObject。
+    """
+
+    def __init__(self, out: pikepdf.Pdf):
+        self.out = out
+        self.forms = dict[tuple[int, int], Optional[pikepdf.Object]]()
+        self.digester = PikepdfDigester()
+        self.by_digest = dict[bytes, pikepdf.Object]()
+
+    def get(self, page: pikepdf.Page) -> Optional[pikepdf.Object]:
+        key = page.obj.objgen
+        if key in self.forms:
+            return self.forms[key]
+        if _is_blank(page):
+            self.forms[key] = None
+            return None
+
+        obj = page.obj
+        digest = self.digester.digest(
+            Array(
+                [
+                    obj.get(Name.Contents),
+                    obj.get(Name.Resources),
+                    obj.get(Name.Group),
+                    page.mediabox,
+                ]
+            )
+        )
+        if (form := self.by_digest.get(digest)) is None:
+            # 与 pypdf 后端一致，不处理 /Rotate 和 /UserUnit
+            form = page.as_form_xobject(handle_transformations=False)
+            # 同一来源的共享资源（字体、图片）只复制一次
+            form = self.out.copy_foreign(form)
+            self.by_digest[digest] = form
+        self.forms[key] = form
+        return form
+
+
+def _links_to_page(annot: Dictionary) -> bool:
+    """注释的目标是否是显式的页面引用（/Dest 或 GoTo 动作的 /D）。"""
+    dest = annot.get(Name.Dest)
+    action = annot.get(Name.A)
+    if (
+        dest is None
+        and isinstance(action, Dictionary)
+        and action.get(Name.S) == Name.GoTo
+    ):
+        dest = action.get(Name.D)
+    return (
+        isinstance(dest, Array)
+        and len(dest) > 0
+        and isinstance(dest[0], Dictionary)
+        and dest[0].is_indirect
+    )
+
+
+def _annots(
+    out: pikepdf.Pdf, src: pikepdf.Pdf, page: pikepdf.Page, trans: Transformation
+) -> list[pikepdf.Object]:
+    """与 `Imposer.annots` 相同：复制注释并变换 /Rect 和 /QuadPoints。"""
+    annots = page.obj.get(Name.Annots)
+    if not isinstance(annots, Array):
+        return []
+    copies = dict[tuple[int, int], pikepdf.Object]()
+    links = list[tuple[pikepdf.Object, str, tuple[int, int]]]()
+    res = list[pikepdf.Object]()
+    for annot in annots:
+        if not isinstance(annot, Dictionary) or _links_to_page(annot):
+            continue
+        annot_copy = Dictionary(annot)
+        if Name.Rect in annot_copy:
+            left, bottom, right, top = (float(v) for v in annot_copy.Rect)
+            corners = [
+                trans.apply_on(pt)
+                for pt in ((left, bottom), (left, top), (right, bottom), (right, top))
+            ]
+            xs = [x for x, _ in corners]
+            ys = [y for _, y in corners]
+            annot_copy.Rect = Array([min(xs), min(ys), max(xs), max(ys)])
+        if isinstance(quad := annot_copy.get(Name.QuadPoints), Array):
+            points = list[float]()
+            for i in range(0, len(quad) - 1, 2):
+                points.extend(trans.apply_on((float(quad[i]), float(quad[i + 1]))))
+            annot_copy.QuadPoints = Array(points)
+        # 注释之间的引用复制后再改为指向副本，/P 不复制
+        pending = list[tuple[str, tuple[int, int]]]()
+        for k in ("/Popup", "/Parent", "/IRT", "/P"):
+            if k in annot_copy:
+                target = annot_copy[k]
+                if k != "/P" and target.is_indirect:
+                    pending.append((k, target.objgen))
+                del annot_copy[k]
+        # `copy_foreign` 只接受间接对象
+        new = out.copy_foreign(src.make_indirect(annot_copy))
+        if annot.is_indirect:
+            copies[annot.objgen] = new
+        links.extend((new, k, target) for k, target in pending)
+        res.append(new)
+
+    for new, k, target in links:
+        if target in copies:
+            new[k] = copies[target]
+    return res
+
+
+def _drop_hidden(out: pikepdf.Pdf, page: Dictionary, halves: list[Dictionary]):
+    """与 `clip.drop_hidden` 相同：删除完全落在半页之外的图片和表单。"""
+    instructions = pikepdf.parse_content_stream(page)
+    resources = page.get(Name.Resources)
+    xobjects = resources.get(Name.XObject) if resources is not None else None
+    operations = [
+        (
+            list(ins.operands),
+            b"INLINE IMAGE"
+            if isinstance(ins, pikepdf.ContentStreamInlineImage)
+            else str(ins.operator).encode(),
+        )
+        for ins in instructions
+    ]
+    placements = _placements(operations, xobjects)
+
+    for half in halves:
+        hidden = _hidden(placements, tuple(float(v) for v in half.MediaBox))
+        if not hidden:
+            continue
+        kept = [ins for i, ins in enumerate(instructions) if i not in hidden]
+        half.Contents = out.make_stream(pikepdf.unparse_content_stream(kept))
+
+        if xobjects is not None:
+            used = {
+                str(operands[0])
+                for i, (operands, operator) in enumerate(operations)
+                if i not in hidden and operator == b"Do"
+            }
+            new_resources = Dictionary(resources)
+            new_resources.XObject = Dictionary(
+                {k: xobjects[k] for k in xobjects.keys() if k in used}
+            )
+            half.Resources = new_resources
+
+
+def make_two_up(
+    input_path: Path | str,
+    output_path: Path | str,
+    vertical: bool = True,
+    booklet: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+):
+    """每两页合并为一页；`booklet` 为真时先按小册子重排。"""
+    with pikepdf.open(input_path) as pdf, pikepdf.new() as out:
+        pages: list[Optional[pikepdf.Page]] = list(pdf.pages)
+        if not pages:
+            # 与 pypdf 后端一致，写出没有页面的文档
+            save(out, output_path, profile)
+            return
+        # 补齐用的空白页（`None`）与第一页尺寸相同
+        _, _, width, height = _box(pages[0])
+        blank_box = (0.0, 0.0, width, height)
+        multiple = 4 if booklet else 2
+        pages.extend([None] * (-len(pages) % multiple))
+        if booklet:
+            pages = sort_to_booklet(pages)
+
+        forms = _Forms(out)
+        new_pages = list[Dictionary]()
+        for page1, page2 in zip(pages[::2], pages[1::2]):
+            box1 = blank_box if page1 is None else _box(page1)
+            box2 = blank_box if page2 is None else _box(page2)
+            width, height, trans1, trans2 = _layout_boxes(box1, box2, vertical)
+
+            xobjects = Dictionary()
+            ops = list[str]()
+            annots = list[pikepdf.Object]()
+            for i, (page, trans) in enumerate(((page1, trans1), (page2, trans2))):
+                if page is None:
+                    continue
+                annots.extend(_annots(out, pdf, page, trans))
+                if (form := forms.get(page)) is None:
+                    continue
+                name = f"/P{i}"
+                xobjects[name] = form
+                ctm = " ".join(map(_pdf_number, trans.ctm))
+                ops.append(f"q {ctm} cm {name} Do Q")
+
+            new_page = Dictionary(
+                MediaBox=Array([0, 0, width, height]),
+                Resources=Dictionary(XObject=xobjects),
+                Contents=out.make_stream("\n".join(ops).encode()),
+            )
+            if annots:
+                new_page.Annots = Array(annots)
+            new_pages.append(new_page)
+
+        _set_pages(out, new_pages)
+        save(out, output_path, profile)
+
+
+def split_two_up(
+    input_path: Path | str,
+    output_path: Path | str,
+    vertical: bool = True,
+    booklet: bool = False,
+    hard: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+):
+    """每页分割为两页；`booklet` 为真时再按小册子还原顺序。
+    `hard` 为真时删除完全落在半页之外的图片和表单。
+    """
+    with pikepdf.open(input_path) as pdf, pikepdf.new() as out:
+        halves = list[Dictionary]()
+        for page in pdf.pages:
+            left, bottom, width, height = _box(page)
+            page_obj = out.copy_foreign(page.obj)
+            pair = list[Dictionary]()
+            for box in _half_boxes(
+                left, bottom, left + width, bottom + height, vertical
+            ):
+                # 浅复制页面字典，内容流和资源仍然是同一对象
+                half = Dictionary(page_obj)
+                half.MediaBox = Array(box)
+                pair.append(half)
+            if hard:
+                _drop_hidden(out, page_obj, pair)
+            halves.extend(pair)
+        if booklet:
+            halves = sort_from_booklet(halves)
+
+        _set_pages(out, halves)
+        save(out, output_path, profile)
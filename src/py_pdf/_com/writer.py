@@ -0,0 +1,265 @@
+import copy
+import io
+from collections import deque
+from typing import Any, BinaryIO, Optional
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+from .digest import ObjectDigester
+from .incremental import copy_file, last_xref, write_xref
+
+HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+
+class StreamingWriter:
+    """边生成边写入的 PDF writer。
+
+    `add_page` 立即把页面以及它引用的、尚未写出的对象写入文件，之后只保留
+    对象号映射和偏移量。来自其它文档（如 `PdfReader`）的对象按引用去重，
+    被多个页面共享的对象只写一次；写出的流对象会从来源文档的缓存中移除，
+    因此峰值内存与单个页面相当，而不是整个文档。
+
+    来源 `PdfReader` 应以文件对象而不是路径打开，否则 pypdf 会把整个文件读入内存。
+
+    `dedupe` 为真时，来源中内容相同的流（如每个文件各嵌入一份的同一字体、
+    重复的图片）按结构哈希合并为一个对象。
+    """
+
+    # 第一个新对象的对象号
+    first_num = 1
+
+    def __init__(self, fp: BinaryIO, dedupe: bool = False):
+        self.fp = fp
+        self.offsets = list[int]()
+        self.mapping = dict[tuple[int, int, int], int]()
+        # 保持来源文档存活，`mapping` 中的 id 不会被复用
+        self.sources = dict[int, Any]()
+        self.pending = deque[tuple[int, PdfObject]]()
+        # `add_object` 登记但尚未写出的对象，写出后不再保留
+        self.unwritten = dict[int, PdfObject]()
+        self.digester = ObjectDigester() if dedupe else None
+        self.by_digest = dict[bytes, int]()
+        self.kids = ArrayObject()
+        # 附加到文档目录（/Catalog）的条目，如 /PageLabels
+        self.catalog = DictionaryObject()
+        self.pages_ref: Optional[IndirectObject] = None
+        self._begin()
+
+    def _begin(self):
+        self.fp.write(HEADER)
+        self.pages_ref = self._reserve()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+
+    def _reserve(self) -> IndirectObject:
+        self.offsets.append(0)
+        num = self.first_num + len(self.offsets) - 1
+        return IndirectObject(num, 0, self)  # type: ignore
+
+    def add_object(self, obj: PdfObject) -> IndirectObject:
+        """登记一个新对象，在下一次 `add_page` 或 `close` 时写出。"""
+        ref = self._reserve()
+        self.pending.append((ref.idnum, obj))
+        self.unwritten[ref.idnum] = obj
+        return ref
+
+    def get_object(self, ref: int | IndirectObject) -> Optional[PdfObject]:
+        """解析本文件的间接引用，只能解析尚未写出的对象。"""
+        num = ref if isinstance(ref, int) else ref.idnum
+        return self.unwritten.get(num)
+
+    def _ref(self, ref: IndirectObject) -> IndirectObject:
+        if ref.pdf is self:
+            return ref
+        key = (id(ref.pdf), ref.idnum, ref.generation)
+        if (num := self.mapping.get(key)) is None:
+            digest = None
+            if self.digester is not None and isinstance(ref.get_object(), StreamObject):
+                # 只比较流：字典可能经 /Parent 等引用到整个页面树
+                digest = self.digester.digest(ref)
+                num = self.by_digest.get(digest)
+            if num is None:
+                num = self._reserve().idnum
+                self.pending.append((num, ref))
+                if digest is not None:
+                    self.by_digest[digest] = num
+            self.mapping[key] = num
+            self.sources[id(ref.pdf)] = ref.pdf
+        return IndirectObject(num, 0, self)  # type: ignore
+
+    def _translate(self, obj: Any, top: bool = False) -> Any:
+        """复制对象的直接部分，把其中的间接引用替换为本文件的对象号。
+        流数据不复制，只共享 `_data`。
+        """
+        if isinstance(obj, IndirectObject):
+            return self._ref(obj)
+        if isinstance(obj, StreamObject) and not top:
+            # 流只能是间接对象
+            return self.add_object(obj)
+        if isinstance(obj, DictionaryObject):
+            res = (
+                copy.copy(obj) if isinstance(obj, StreamObject) else DictionaryObject()
+            )
+            for k, v in obj.items():
+                res[NameObject(k)] = self._translate(v)
+            if res.get("/Type") == "/Page" and self.pages_ref is not None:
+                # 被引用（而非通过 add_page 加入）的页面不能把来源的页面树带进来
+                res[NameObject("/Parent")] = self.pages_ref
+            return res
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._translate(v) for v in obj)
+        return obj
+
+    def _write(self, num: int, obj: Any):
+        obj = NullObject() if obj is None else self._translate(obj, top=True)
+        self.offsets[num - self.first_num] = self.fp.tell()
+        self.fp.write(f"{num} 0 obj\n".encode())
+        obj.write_to_stream(self.fp)
+        self.fp.write(b"\nendobj\n")
+
+    def _flush(self):
+        while self.pending:
+            num, obj = self.pending.popleft()
+            if not isinstance(obj, IndirectObject):
+                self._write(num, obj)
+                self.unwritten.pop(num, None)
+                continue
+            resolved = obj.get_object()
+            self._write(num, resolved)
+            if isinstance(resolved, StreamObject):
+                cache = getattr(obj.pdf, "resolved_objects", None)
+                if cache is not None:
+                    cache.pop((obj.generation, obj.idnum), None)
+
+    def add_page(self, page: PageObject):
+        page_ref = self._reserve()
+        source = page.indirect_reference
+        if source is not None and source.pdf is not None and source.pdf is not self:
+            key = (id(source.pdf), source.idnum, source.generation)
+            self.mapping.setdefault(key, page_ref.idnum)
+
+        page = DictionaryObject(
+            {k: v for k, v in page.items() if k not in ("/Parent", "/StructParents")}
+        )
+        page[NameObject("/Parent")] = self.pages_ref
+        self.pending.appendleft((page_ref.idnum, page))
+        self.kids.append(page_ref)
+        self._flush()
+
+    def close(self):
+        pages = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Pages"),
+                NameObject("/Kids"): self.kids,
+                NameObject("/Count"): NumberObject(len(self.kids)),
+            }
+        )
+        self.pending.append((self.pages_ref.idnum, pages))
+        catalog = DictionaryObject(self.catalog)
+        catalog[NameObject("/Type")] = NameObject("/Catalog")
+        catalog[NameObject("/Pages")] = self.pages_ref
+        root = self.add_object(catalog)
+        self._flush()
+
+        fp = self.fp
+        xref = fp.tell()
+        fp.write(f"xref\n0 {len(self.offsets) + 1}\n".encode())
+        fp.write(b"0000000000 65535 f \n")
+        for offset in self.offsets:
+            fp.write(f"{offset:010d} 00000 n \n".encode())
+        fp.write(f"trailer\n<< /Size {len(self.offsets) + 1} ".encode())
+        fp.write(f"/Root {root.idnum} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+class IncrementalWriter(StreamingWriter):
+    """以增量更新的方式修改 `base` 文档。
+
+    输出文件先原样复制 `base` 的全部字节，之后只追加 `update` 替换的对象、
+    它们引用的新对象和一个新的交叉引用段。引用 `base` 中的对象时沿用原对象号，
+    不会再写一遍。`catalog` 中的条目会合并到原文档目录中。
+    """
+
+    def __init__(self, fp: BinaryIO, base: PdfReader):
+        if base.is_encrypted:
+            raise ValueError("incremental update of encrypted PDF is not supported")
+        self.base = base
+        self.first_num = int(base.trailer["/Size"])
+        # 被替换的原有对象：对象号 -> (偏移量, 代数)
+        self.updated = dict[int, tuple[int, int]]()
+        self.generations = dict[int, int]()
+        super().__init__(fp)
+
+    def _begin(self):
+        self.prev, self.use_stream = last_xref(self.base.stream)
+        copy_file(self.base.stream, self.fp)
+        self.fp.write(b"\n")
+
+    def _ref(self, ref: IndirectObject) -> IndirectObject:
+        if ref.pdf is self.base:
+            return IndirectObject(ref.idnum, ref.generation, self)  # type: ignore
+        return super()._ref(ref)
+
+    def _write(self, num: int, obj: Any):
+        if num >= self.first_num:
+            super()._write(num, obj)
+            return
+        obj = self._translate(obj, top=True)
+        gen = self.generations[num]
+        self.updated[num] = (self.fp.tell(), gen)
+        self.fp.write(f"{num} {gen} obj\n".encode())
+        obj.write_to_stream(self.fp)
+        self.fp.write(b"\nendobj\n")
+
+    def update(self, ref: IndirectObject, obj: PdfObject):
+        """用 `obj` 替换 `base` 中的间接对象 `ref`，对象号和代数不变。"""
+        self.generations[ref.idnum] = ref.generation
+        self.pending.append((ref.idnum, obj))
+
+    def update_page(self, page: PageObject, new_page: PageObject):
+        """用 `new_page` 替换 `base` 中的页面 `page`，页面树不变。"""
+        if "/Parent" not in new_page:
+            new_page[NameObject("/Parent")] = page.raw_get("/Parent")
+        self.update(page.indirect_reference, new_page)
+        self._flush()
+
+    def close(self):
+        trailer = self.base.trailer
+        root_ref = trailer.raw_get("/Root")
+        if self.catalog:
+            root = root_ref.get_object()
+            catalog = DictionaryObject({NameObject(k): root.raw_get(k) for k in root})
+            catalog.update(self.catalog)
+            self.update(root_ref, catalog)
+        self._flush()
+
+        offsets = dict(self.updated)
+        for i, offset in enumerate(self.offsets):
+            offsets[self.first_num + i] = (offset, 0)
+        entries = {"/Prev": b"%d" % self.prev}
+        for k in ("/Root", "/Info", "/ID"):
+            if k in trailer:
+                buf = io.BytesIO()
+                trailer.raw_get(k).write_to_stream(buf)
+                entries[k] = buf.getvalue()
+        write_xref(
+            self.fp,
+            offsets,
+            self.first_num + len(self.offsets),
+            entries,
+            self.use_stream,
+        )
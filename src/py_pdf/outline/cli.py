@@ -2,11 +2,14 @@ import argparse
 from pathlib import Path
 
 from py_pdf._com import new_path_with_timestamp
+from py_pdf._com.profile import PROFILES
 
 from .core import (
     get_outline,
+    read_manifest,
     remove_outline,
     set_outline,
+    set_outline_batch,
 )
 
 
@@ -32,7 +35,43 @@ def cli():
     cmd_rm = subparsers.add_parser("rm", help="删除outline")
     cmd_rm.add_argument("pdf_file_path", type=Path, help="输入PDF文件路径")
 
+    for cmd in (cmd_set, cmd_rm):
+        cmd.add_argument(
+            "-i",
+            "--incremental",
+            action="store_true",
+            help="增量更新，只追加修改的对象",
+        )
+
+    cmd_batch = subparsers.add_parser(
+        "batch", help="按清单批量设置outline，每行：PDF文件,outline文件[,页码偏移量]"
+    )
+    cmd_batch.add_argument("manifest_path", type=Path, help="清单文件路径（CSV）")
+    cmd_batch.add_argument("-j", "--jobs", type=int, default=1, help="并发进程数")
+
+    for cmd in (cmd_set, cmd_rm, cmd_batch):
+        cmd.add_argument(
+            "--profile",
+            choices=PROFILES,
+            default="fast",
+            help="输出配置：fast 直接写出，compact 体积最小，web 线性化",
+        )
+
     args = parser.parse_args()
+    if args.cmd == "batch":
+        entries = read_manifest(args.manifest_path)
+        failed = 0
+        for entry, output_path, error in set_outline_batch(
+            entries, args.jobs, PROFILES[args.profile]
+        ):
+            if error is None:
+                print(f"{entry.pdf} -> {output_path}")
+            else:
+                failed += 1
+                print(f"{entry.pdf}: {error}")
+        print(f"done: {len(entries) - failed} ok, {failed} failed")
+        return
+
     pdf_file_path: Path = args.pdf_file_path
 
     match args.cmd:
@@ -47,11 +86,20 @@ def cli():
             outline_txt_path: Path = args.outline_file_path
             page_offset: int = args.page_offset
             output_path = new_path_with_timestamp(pdf_file_path)
-            set_outline(pdf_file_path, output_path, outline_txt_path, page_offset)
-            print(f"save as\n{output_path}")
+            if set_outline(
+                pdf_file_path,
+                output_path,
+                outline_txt_path,
+                page_offset,
+                args.incremental,
+                PROFILES[args.profile],
+            ):
+                print(f"save as\n{output_path}")
         case "rm":
             output_path = new_path_with_timestamp(pdf_file_path)
-            remove_outline(pdf_file_path, output_path)
+            remove_outline(
+                pdf_file_path, output_path, args.incremental, PROFILES[args.profile]
+            )
             print(f"save as\n{output_path}")
         case _:
             # should not reach here
@@ -2,160 +2,347 @@
 
 支持提取、设置、删除、重置大纲。"""
 
-from itertools import chain, starmap
+import csv
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Iterator
-
-from pikepdf import Array, Name, OutlineItem, Page, Pdf, String
-
-from .parser import OutlineItem as _OutlineItem
-from .parser import OutlineItemNode, parse_from_file, serialize_lines
-
-
-def parse_outline_tree(
-    outlines: list[OutlineItem], level: int = 1, names=None
-) -> list[_OutlineItem]:
-    def cvt_outline_item(item: OutlineItem, level: int) -> _OutlineItem:
-        return _OutlineItem(level, item.title, get_destiny_page_number(item, names) + 1)
-
-    def dfs(node: OutlineItem, level: int) -> Iterator[tuple[OutlineItem, int]]:
-        yield node, level
-        for child in node.children:
-            yield from dfs(child, level + 1)
-
-    items = chain.from_iterable(dfs(outline, level) for outline in outlines)
-    return list(starmap(cvt_outline_item, items))
-
-
-def get_destiny_page_number(outline: OutlineItem, names) -> int:
-    def find_destiny(ref, names) -> int:
+from typing import Any, Iterable, Iterator, Optional
+
+from pikepdf import Array, Dictionary, Name, Pdf, String
+
+from py_pdf._com import new_path_with_timestamp
+from py_pdf._com.incremental import object_ids, save_incremental
+from py_pdf._com.profile import DEFAULT_PROFILE, OutputProfile, save
+
+from .parser import CompactOutline, serialize_lines
+
+
+class NameTree:
+    """按需查找的名称树。
+
+    从根节点开始，用子节点的 /Limits 二分查找，只访问包含目标名称的分支。
+    访问过的叶子节点和 /Limits 会被缓存，同一叶子中的其它名称不再重复读取。
+    缺少 /Limits 的子节点（不规范的文件）退化为逐个查找。
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.leaves = dict[tuple[int, int], dict[bytes, Any]]()
+        self.limits = dict[tuple[int, int], Optional[tuple[bytes, bytes]]]()
+
+    def _leaf(self, node) -> dict[bytes, Any]:
+        key = node.objgen
+        if (res := self.leaves.get(key)) is not None:
+            return res
+        names = node.Names
+        res = {bytes(names[n]): names[n + 1] for n in range(0, len(names) - 1, 2)}
+        # 直接对象没有对象号，不缓存
+        if key != (0, 0):
+            self.leaves[key] = res
+        return res
+
+    def _limits(self, node) -> Optional[tuple[bytes, bytes]]:
+        key = node.objgen
+        if key in self.limits:
+            return self.limits[key]
+        limits = node.get("/Limits")
+        res = None if limits is None else (bytes(limits[0]), bytes(limits[1]))
+        if key != (0, 0):
+            self.limits[key] = res
+        return res
+
+    def _get(self, node, name: bytes) -> Any:
+        if "/Names" in node:
+            return self._leaf(node).get(name)
+        kids = node.get("/Kids")
+        if kids is None:
+            return None
+
+        lo, hi = 0, len(kids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            limits = self._limits(kids[mid])
+            if limits is None:
+                for kid in kids:
+                    if (res := self._get(kid, name)) is not None:
+                        return res
+                return None
+            first, last = limits
+            if name < first:
+                hi = mid
+            elif name > last:
+                lo = mid + 1
+            else:
+                return self._get(kids[mid], name)
+        return None
+
+    def get(self, name: bytes) -> Any:
+        return self._get(self.root, name)
+
+
+class Destinations:
+    """文档的目标索引，每个文档只建立一次。
+
+    命名目标在 /Root/Names/Dests 名称树中按需查找，也支持 PDF 1.1 的
+    /Root/Dests 字典。`pages` 把页面对象的 objgen 映射到页面序号。
+    """
+
+    def __init__(self, pdf: Pdf):
+        self.pages = {page.objgen: i for i, page in enumerate(pdf.pages)}
+        root = pdf.Root if hasattr(pdf, "Root") else {}
+        self.names = None
+        if "/Names" in root and "/Dests" in root.Names:
+            self.names = NameTree(root.Names.Dests)
+        self.dests = root.get("/Dests")
+
+    def _named(self, ref) -> Any:
+        if isinstance(ref, String):
+            key, name = bytes(ref), Name("/" + str(ref))
+        else:
+            key, name = str(ref)[1:].encode(), ref
+        target = None
+        if self.names is not None:
+            target = self.names.get(key)
+        if target is None and self.dests is not None:
+            target = self.dests.get(name)
+        return target
+
+    def find(self, ref) -> int:
         resolved = None
         if isinstance(ref, Array):
             resolved = ref[0]
         else:
-            for n in range(0, len(names) - 1, 2):
-                if names[n] == ref:
-                    if names[n + 1]._type_name == "array":
-                        named_page = names[n + 1][0]
-                    elif names[n + 1]._type_name == "dictionary":
-                        named_page = names[n + 1].D[0]
-                    else:
-                        raise TypeError("Unknown type: %s" % type(names[n + 1]))
-                    resolved = named_page
-                    break
-
+            target = self._named(ref)
+            if target is not None:
+                if target._type_name == "array":
+                    resolved = target[0]
+                elif target._type_name == "dictionary":
+                    resolved = target.D[0]
+                else:
+                    raise TypeError("Unknown type: %s" % type(target))
+
+        if isinstance(resolved, int):
+            return resolved
         if resolved is not None:
-            # note: is this tpye hint error? .pyi says it is a method `()->int`, but a literal `int`
-            return Page(resolved).index  # type: ignore
+            return self.pages.get(resolved.objgen, 0)
         return 0
 
-    if outline.destination is None:
-        return find_destiny(outline.action.D, names)  # type: ignore
-
-    if isinstance(outline.destination, Array):
-        # 12.3.2.2 Explicit destination
-        # [raw_page, /PageLocation.SomeThing, integer parameters for viewport]
-        raw_page = outline.destination[0]
-        try:
-            # note: is this tpye hint error? .pyi says it is a method `()->int`, but a literal `int`
-            return Page(raw_page).index  # type: ignore
-        except Exception:
-            return find_destiny(outline.destination, names)
-    elif isinstance(outline.destination, String):
-        # 12.3.2.2 Named destination, byte string reference to Names
-        # destiny = f'<Named Destination in document .Root.Names dictionary: {outline.destination}>'
-        assert names is not None
-        return find_destiny(outline.destination, names)
-    elif isinstance(outline.destination, Name):
-        # 12.3.2.2 Named destination, name object (PDF 1.1)
-        # destiny = f'<Named Destination in document .Root.Dests dictionary: {outline.destination}>'
-        return find_destiny(outline.destination, names)
-    elif isinstance(outline.destination, int):
-        # Page number
-        return outline.destination
-
-    return outline.destination
 
+def _destination(item) -> Any:
+    dest = item.get("/Dest")
+    if dest is None and (action := item.get("/A")) is not None:
+        dest = action.get("/D")
+    return dest
+
+
+def read_outline(pdf: Pdf, dests: Destinations) -> CompactOutline:
+    """沿 /First、/Next 链遍历原始大纲字典，不构造 pikepdf 的 `OutlineItem`。
+    页码从 1 开始。
+    """
+    res = CompactOutline()
+    root = pdf.Root.get("/Outlines") if hasattr(pdf, "Root") else None
+    if root is None:
+        return res
+
+    seen = set[tuple[int, int]]()
+    stack = [(root.get("/First"), 1)]
+    while stack:
+        item, level = stack.pop()
+        if item is None:
+            continue
+        # 防止损坏文件中的循环链表
+        if item.is_indirect:
+            if item.objgen in seen:
+                continue
+            seen.add(item.objgen)
+
+        dest = _destination(item)
+        page = 0 if dest is None else dests.find(dest)
+        res.append(level, str(item.get("/Title", "")), page + 1)
+        # 先子节点，后兄弟节点
+        stack.append((item.get("/Next"), level))
+        stack.append((item.get("/First"), level + 1))
+    return res
 
-def get_outline(input_path: Path) -> str:
-    # https://github.com/pikepdf/pikepdf/issues/149#issuecomment-860073511
-    def has_nested_key(obj, keys):
-        to_check = obj
-        for key in keys:
-            if key not in to_check.keys():
-                return False
-            to_check = to_check[key]
-        return True
-
-    def get_names(pdf: Pdf) -> list:
-        # 此处可能出错（可能由于PDF被其它程序编辑过）
-        if not hasattr(pdf, "Root"):
-            return []
-        if not has_nested_key(pdf.Root, ["/Names", "/Dests"]):
-            return []
-        obj = pdf.Root.Names.Dests
-        ks = obj.keys()
-        if "/Names" in ks:
-            return obj.Names  # type: ignore
-        elif "/Kids" in ks:
-            return list(chain.from_iterable(map(get_names, obj.Kids)))  # type: ignore
-        else:
-            raise ValueError
 
+def get_outline(input_path: Path) -> str:
     with Pdf.open(input_path) as pdf:
-        names = get_names(pdf)
+        outline = read_outline(pdf, Destinations(pdf))
 
-        with pdf.open_outline() as outline:
-            outlines = parse_outline_tree(outline.root, names=names)
-
-    s = serialize_lines(outlines)
+    s = serialize_lines(outline)
     return "\n".join(s)
 
 
-def set_outline(
-    input_path: Path, output_path: Path, outline_txt_path: Path, page_offset: int
-):
-    MAX_PAGES: int
+def write_outline(pdf: Pdf, outline: CompactOutline, page_offset: int = 0):
+    """把大纲直接写成 /Outlines 字典链，条目全部展开。"""
+    root = pdf.make_indirect(Dictionary(Type=Name.Outlines))
+    # (字典, 层级, 最后一个子节点, 子孙数)
+    stack: list[list[Any]] = [[root, 0, None, 0]]
+
+    def close(node: list[Any]):
+        item, _, last, count = node
+        if last is not None:
+            item.Last = last
+        item.Count = count
+
+    pages = pdf.pages
+    for level, title, page in outline:
+        while level <= stack[-1][1]:
+            close(stack.pop())
+        parent = stack[-1]
+        item = pdf.make_indirect(
+            Dictionary(
+                Title=String(title),
+                Parent=parent[0],
+                Dest=Array([pages[page + page_offset - 1].obj, Name.Fit]),
+            )
+        )
+        if parent[2] is None:
+            parent[0].First = item
+        else:
+            parent[2].Next = item
+            item.Prev = parent[2]
+        parent[2] = item
+        for node in stack:
+            node[3] += 1
+        stack.append([item, level, None, 0])
+
+    while stack:
+        close(stack.pop())
+    pdf.Root.Outlines = root
+
+
+def _apply_outline(
+    input_path: Path,
+    output_path: Path,
+    outline_txt_path: Path,
+    page_offset: int,
+    incremental: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+) -> Optional[str]:
+    """输入文件只打开一次：检查页码范围、写入大纲并保存。出错时返回错误信息。"""
+    _check_incremental(incremental, profile)
+    with open(outline_txt_path, "r", encoding="utf-8") as f:
+        outline = CompactOutline.from_lines(f)
 
-    class OutOfRangeError(Exception):
-        pass
+    with Pdf.open(input_path) as pdf:
+        max_pages = len(pdf.pages)
+        for page in outline.pages:
+            page += page_offset - 1
+            if not 0 <= page < max_pages:
+                return f"page index out of range: {page} >= {max_pages}"
+
+        base_ids = object_ids(pdf)
+        write_outline(pdf, outline, page_offset)
+        if incremental:
+            save_incremental(pdf, input_path, output_path, base_ids, [pdf.Root])
+        else:
+            save(pdf, output_path, profile)
+    return None
 
-    def dfs(node: OutlineItemNode, parent: OutlineItem):
-        item = node.item
-        page = item.page + page_offset - 1
-        if page >= MAX_PAGES:
-            print(f"page index out of range: {page} >= {MAX_PAGES}")
-            raise OutOfRangeError
 
-        new_outline = OutlineItem(item.title, page)
-        parent.children.append(new_outline)
-        if node.children is None:
-            return
-        for child in node.children:
-            dfs(child, new_outline)
+def _check_incremental(incremental: bool, profile: OutputProfile):
+    if incremental and profile.rewrite:
+        raise ValueError("incremental update cannot rewrite the file with a profile")
 
-    root = parse_from_file(str(outline_txt_path))
-    outlineitem = OutlineItem("")
 
+def set_outline(
+    input_path: Path,
+    output_path: Path,
+    outline_txt_path: Path,
+    page_offset: int,
+    incremental: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+) -> bool:
+    """`incremental` 为真时以增量更新保存，只在原文件后追加新的大纲和目录对象。
+    `profile` 是输出配置，不能与 `incremental` 同时使用。
+    """
+    error = _apply_outline(
+        input_path, output_path, outline_txt_path, page_offset, incremental, profile
+    )
+    if error is not None:
+        print(error)
+    return error is None
+
+
+@dataclass
+class ManifestEntry:
+    pdf: Path
+    outline: Path
+    offset: int = 0
+
+
+def read_manifest(manifest_path: Path) -> list[ManifestEntry]:
+    """读取批量设置大纲的清单。
+
+    清单是 CSV 文件，每行 `PDF文件,大纲文件[,页码偏移量]`，
+    空行和 `#` 开头的行被忽略，相对路径相对于清单所在目录。
+    """
+    base = manifest_path.parent
+    res = list[ManifestEntry]()
+    with open(manifest_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            offset = int(row[2]) if len(row) > 2 and row[2] else 0
+            res.append(ManifestEntry(base / row[0], base / row[1], offset))
+    return res
+
+
+def _apply_entry(
+    entry: ManifestEntry, profile: OutputProfile = DEFAULT_PROFILE
+) -> tuple[Path, Optional[str]]:
+    output_path = new_path_with_timestamp(entry.pdf)
+    try:
+        error = _apply_outline(
+            entry.pdf, output_path, entry.outline, entry.offset, profile=profile
+        )
+    except Exception as e:
+        error = str(e)
+    return output_path, error
+
+
+def set_outline_batch(
+    entries: Iterable[ManifestEntry],
+    jobs: int = 1,
+    profile: OutputProfile = DEFAULT_PROFILE,
+) -> Iterator[tuple[ManifestEntry, Path, Optional[str]]]:
+    """在进程池中为多个文件设置大纲，按完成顺序返回 (条目, 输出路径, 错误信息)。
+    单个文件失败不影响其它文件。
+    """
+    if jobs <= 1:
+        for entry in entries:
+            yield entry, *_apply_entry(entry, profile)
+        return
+
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as executor:
+        futures = {
+            executor.submit(_apply_entry, entry, profile): entry for entry in entries
+        }
+        for future in as_completed(futures):
+            yield futures[future], *future.result()
+
+
+def remove_outline(
+    input_path: Path,
+    output_path: Path,
+    incremental: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+):
+    _check_incremental(incremental, profile)
     with Pdf.open(input_path) as pdf:
-        MAX_PAGES = len(pdf.pages)
-        try:
-            dfs(root, outlineitem)
-        except OutOfRangeError:
+        if incremental:
+            base_ids = object_ids(pdf)
+            if "/Outlines" in pdf.Root:
+                del pdf.Root.Outlines
+            save_incremental(pdf, input_path, output_path, base_ids, [pdf.Root])
             return
 
-        with Pdf.open(input_path) as pdf:
-            with pdf.open_outline() as outline:
-                outline.root[:] = outlineitem.children[0].children
-
-            pdf.save(output_path)
-
-
-def remove_outline(input_path: Path, output_path: Path):
-    with Pdf.open(input_path) as pdf:
         # The next line does not work, I don't know why. 2025-01-20
         # pdf.open_outline().root.clear()
         with pdf.open_outline() as outline:
             outline.root.clear()
 
-        pdf.save(output_path)
+        save(pdf, output_path, profile)
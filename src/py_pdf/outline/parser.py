@@ -22,6 +22,7 @@ r"""大纲解析器
 """
 
 import re
+from array import array
 from dataclasses import dataclass, field
 from itertools import chain
 from typing import Iterable, Iterator, Optional
@@ -56,14 +57,57 @@ def parse_lines(lines: Iterable[str]) -> Iterable[OutlineItem]:
         yield item
 
 
-def serialize_lines(items: Iterable[OutlineItem]) -> Iterable[str]:
-    tmp = [item.level + len(item.title) for item in items]
-    if len(tmp) == 0:
+class CompactOutline:
+    """用数组保存的大纲，适合十万级的条目。
+
+    层级和页码保存在 `array` 中，标题以 UTF-8 连续保存在一个缓冲区里，
+    不为每个条目创建对象。迭代时逐个产生 `(level, title, page)`。
+    """
+
+    def __init__(self):
+        self.levels = array("H")
+        self.pages = array("q")
+        self.title_ends = array("Q")
+        self.titles = bytearray()
+
+    def append(self, level: int, title: str, page: int):
+        self.levels.append(level)
+        self.pages.append(page)
+        self.titles += title.encode()
+        self.title_ends.append(len(self.titles))
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def title(self, i: int) -> str:
+        start = self.title_ends[i - 1] if i > 0 else 0
+        return self.titles[start : self.title_ends[i]].decode()
+
+    def __iter__(self) -> Iterator[tuple[int, str, int]]:
+        for i in range(len(self)):
+            yield self.levels[i], self.title(i), self.pages[i]
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "CompactOutline":
+        res = cls()
+        for line in lines:
+            m = PATTERN.match(line.strip())
+            if m is not None:
+                res.append(len(m.group(1)), m.group(2).strip(), int(m.group(3)))
+        return res
+
+
+def serialize_lines(items: Iterable[OutlineItem] | CompactOutline) -> Iterable[str]:
+    if isinstance(items, CompactOutline):
+        rows = items
+    else:
+        rows = [(item.level, item.title, item.page) for item in items]
+    length = max((level + len(title) for level, title, _ in rows), default=None)
+    if length is None:
         return
-    length = max(tmp)
-    for item in items:
-        tmp = f"{'#' * item.level} {item.title}"
-        yield f"{tmp: <{length + 1}}  {item.page}"
+    for level, title, page in rows:
+        tmp = f"{'#' * level} {title}"
+        yield f"{tmp: <{length + 1}}  {page}"
 
 
 @dataclass
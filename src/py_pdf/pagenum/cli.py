@@ -7,6 +7,7 @@ import argparse
 from pathlib import Path
 
 from py_pdf._com import new_path_with_timestamp
+from py_pdf._com.profile import PROFILES
 
 from .config import cfg_template
 from .core import add_pagenum
@@ -19,6 +20,21 @@ def main() -> int:
         formatter_class=argparse.RawTextHelpFormatter,
     )
     parser.add_argument("input_file", type=Path, help="input PDF file")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="number of worker processes"
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="append changes to a copy of the input (incremental update)",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        default="fast",
+        help="output profile: fast, compact (smallest) or web (linearized)",
+    )
 
     args = parser.parse_args()
     input_file: Path = args.input_file
@@ -32,7 +48,14 @@ def main() -> int:
     output_file = new_path_with_timestamp(input_file)
 
     try:
-        add_pagenum(input_file, output_file, config_str)
+        add_pagenum(
+            input_file,
+            output_file,
+            config_str,
+            args.jobs,
+            args.incremental,
+            profile=PROFILES[args.profile],
+        )
     except Exception as e:
         print(f"Error: {e}")
 
@@ -6,7 +6,7 @@ from typing import Any
 
 from mashumaro.mixins.toml import DataClassTOMLMixin
 
-from .font import DEFAULT_FONT_NAME, DEFAULT_FONT_SIZE, FONT_DICT, register_font
+from .font import DEFAULT_FONT_NAME, DEFAULT_FONT_SIZE, load_font
 
 
 @dataclass
@@ -66,19 +66,24 @@ class Config(DataClassTOMLMixin):
     num_fmt: str = field(default="{:d}")
     font_name: str = field(default=DEFAULT_FONT_NAME)
     font_size: int = field(default=DEFAULT_FONT_SIZE)
+    stamp: bool = field(default=True)
+    page_labels: bool = field(default=False)
 
     def __post_init__(self):
-        if self.font_name not in FONT_DICT:
-            self.font_name = register_font(self.font_name)
+        self.font_name = load_font(self.font_name)
+
+
+def normalize_keys(sth: dict[str, Any]) -> dict[str, Any]:
+    """配置项可以用 `-` 代替 `_`，如 `num-fmt`。"""
+    for k in tuple(sth.keys()):
+        if "-" in k:
+            sth[k.replace("-", "_")] = sth.pop(k)
+    return sth
 
 
 def parse_config(config_str: str) -> Config:
     def replace_hyphen_with_underscore(s: str) -> dict[str, Any]:
-        sth = tomllib.loads(s)
-        for k in tuple(sth.keys()):
-            if "-" in k:
-                sth[k.replace("-", "_")] = sth.pop(k)
-        return sth
+        return normalize_keys(tomllib.loads(s))
 
     return Config.from_toml(config_str, replace_hyphen_with_underscore)
 
@@ -95,6 +100,11 @@ num_fmt = "{:d}"
 font_name = "Times New Roman"
 font_size = 16
 
+# 页码以表单叠加在原页面上，原内容流不改写；设为 false 则合并重写整页内容
+stamp = true
+# 只写入 /PageLabels 页面标签（阅读器显示的页码），不在页面上绘制页码
+page_labels = false
+
 # 页码位置，坐标原点在左下角
 [num_pos]
 # 从左到右 1/2 的位置
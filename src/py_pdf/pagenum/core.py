@@ -1,15 +1,35 @@
+import re
 from pathlib import Path
-from typing import Sequence
+from typing import Optional, Sequence
 
-from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from py_pdf._com.profile import DEFAULT_PROFILE, OutputProfile, finish
+from py_pdf._com.writer import IncrementalWriter, StreamingWriter
 
 from .config import Config, NumMode, PageRange, parse_config
-from .text import add_text
+from .text import Stamper, TextSpec, create_text_pages, merge_text_page
 
 
-def _add_pagenum(
-    config: Config, page_range: Sequence[PageRange], pages: Sequence[PageObject]
-) -> list[PageObject]:
+def resolve_page_range(config: Config, num_pages: int) -> list[PageRange]:
+    """未指定页码范围时全文档编号，第 1 页对应页码 1。"""
+    if config.page_range == "":
+        return [PageRange(1, num_pages, 1)]
+    return PageRange.parse_range(config.page_range)
+
+
+def _page_plan(
+    config: Config, page_range: Sequence[PageRange]
+) -> dict[int, tuple[int, float]]:
+    """页面序号（从 0 开始）到页码和 x 位置的映射。"""
+
     def gen_i():
         x = config.num_pos.x
 
@@ -33,47 +53,128 @@ def _add_pagenum(
                 yield i, r.num_start + a, next(g)
                 a += 1
 
-    inx = {i: (num, x) for i, num, x in gen_i()}
-    ret = []
-    for i, page in enumerate(pages):
-        if i not in inx:
-            ret.append(page)
+    return {i: (num, x) for i, num, x in gen_i()}
+
+
+def page_labels(
+    config: Config, page_range: Sequence[PageRange], num_pages: int
+) -> DictionaryObject:
+    """把页码范围转换为 /PageLabels 数字树。
+
+    `num_fmt` 形如 `前缀{:d}` 时，每段连续页码只需一个条目（/S /D 加 /P 前缀）；
+    其它格式无法用标签样式表示，每页一个只含 /P 的条目。
+    不在页码范围内的页面使用物理页码。
+    """
+    plan = _page_plan(config, page_range)
+    rematch = re.fullmatch(r"([^{}]*)\{:d\}", config.num_fmt)
+    prefix = None if rematch is None else rematch.group(1)
+
+    nums = ArrayObject()
+    prev = None
+    for i in range(num_pages):
+        if i in plan:
+            num = plan[i][0]
+            if prefix is None or num < 1:
+                label = {"/P": TextStringObject(config.num_fmt.format(num))}
+                continue_run = False
+            else:
+                label = {"/S": NameObject("/D"), "/St": NumberObject(num)}
+                if prefix:
+                    label["/P"] = TextStringObject(prefix)
+                continue_run = prev == ("num", num - 1)
+            prev = ("num", num)
+        else:
+            label = {"/S": NameObject("/D"), "/St": NumberObject(i + 1)}
+            continue_run = prev == ("physical", i)
+            prev = ("physical", i + 1)
+        if continue_run:
             continue
-        num, x = inx[i]
-        page = add_text(
-            page,
-            x,
+        nums.append(NumberObject(i))
+        nums.append(DictionaryObject({NameObject(k): v for k, v in label.items()}))
+
+    return DictionaryObject({NameObject("/Nums"): nums})
+
+
+def _add_pagenum(
+    config: Config,
+    page_range: Sequence[PageRange],
+    pages: Sequence[PageObject],
+    stamper: Optional[Stamper] = None,
+    jobs: int = 1,
+) -> list[PageObject]:
+    inx = _page_plan(config, page_range)
+    numbered = [i for i in range(len(pages)) if i in inx]
+    specs = [
+        TextSpec(
+            float(pages[i].mediabox.width),
+            float(pages[i].mediabox.height),
+            inx[i][1],
             config.num_pos.y,
-            config.num_fmt.format(num),
+            config.num_fmt.format(inx[i][0]),
             config.font_name,
             config.font_size,
         )
+        for i in numbered
+    ]
+    # 每页的页码和位置都已确定，分段生成不影响交错模式
+    text_pages = dict(zip(numbered, create_text_pages(specs, jobs)))
+
+    merge = merge_text_page if stamper is None else stamper.stamp
+    ret = []
+    for i, page in enumerate(pages):
+        if i in text_pages:
+            page = merge(page, text_pages[i])
         ret.append(page)
 
     return ret
 
 
 def add_pagenum(
-    input_file: Path | str, output_file: Path | str, config_str: str
+    input_file: Path | str,
+    output_file: Path | str,
+    config_str: str,
+    jobs: int = 1,
+    incremental: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
 ) -> None:
-    reader = PdfReader(input_file)
-    pages = reader.pages
-
+    """添加页码。
+
+    `incremental` 为真时以增量更新的方式保存：复制原文件后只追加修改过的页面
+    （或 /PageLabels）和新对象，不能用于加密的文件。
+    `profile` 是输出配置，不能与 `incremental` 同时使用。
+    """
+    if incremental and profile.rewrite:
+        raise ValueError("incremental update cannot rewrite the file with a profile")
     config = parse_config(config_str)
 
-    if config.page_range == "":
-        page_range = [PageRange(0, len(pages) - 1, 1)]
-    else:
-        page_range = PageRange.parse_range(config.page_range)
+    with open(input_file, "rb") as in_fp, open(output_file, "wb+") as out_fp:
+        reader = PdfReader(in_fp)
+        pages = reader.pages
 
-    pages = _add_pagenum(config, page_range, pages)
+        page_range = resolve_page_range(config, len(pages))
 
-    writer = PdfWriter()
-    for page in pages:
-        writer.add_page(page)
+        if incremental:
+            writer = IncrementalWriter(out_fp, reader)
+        else:
+            writer = StreamingWriter(out_fp, profile.dedupe)
+        if config.page_labels:
+            # 只写页面标签，页面内容原样复制
+            writer.catalog[NameObject("/PageLabels")] = page_labels(
+                config, page_range, len(pages)
+            )
+            numbered = pages
+        else:
+            stamper = Stamper(writer) if config.stamp else None
+            numbered = _add_pagenum(config, page_range, pages, stamper, jobs)
+        if isinstance(writer, IncrementalWriter):
+            for page, new_page in zip(pages, numbered):
+                if new_page is not page:
+                    writer.update_page(page, new_page)
+        else:
+            for page in numbered:
+                writer.add_page(page)
 
-    with open(output_file, "wb") as fp:
-        writer.write(fp)
+        writer.close()
+        reader.close()
 
-    writer.close()
-    reader.close()
+    finish(output_file, profile)
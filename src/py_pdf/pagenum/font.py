@@ -1,8 +1,16 @@
+import contextlib
+import functools
+import hashlib
+import os
 import os.path as osp
-from typing import Optional
+import pickle
+from pathlib import Path
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
 
+from reportlab import Version
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfbase.ttfonts import TTFError, TTFont, TTFontFace, TTFOpenFile
 
 FONT_DICT = {
     "黑体": "SimHei.ttf",
@@ -18,21 +26,120 @@ FONT_DICT = {
 DEFAULT_FONT_NAME = "Times New Roman"
 DEFAULT_FONT_SIZE = 16
 
+FONT_CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "py_pdf"
+    / "fonts"
+)
+
+# 缓存文件损坏或由不兼容的版本写出时，`pickle.load` 可能抛出的异常
+_BAD_CACHE_ERRORS = (
+    pickle.UnpicklingError,
+    EOFError,
+    AttributeError,
+    ImportError,
+    IndexError,
+    KeyError,
+    TypeError,
+    ValueError,
+)
+
+
+def _dump_font(font: TTFont) -> dict[str, Any]:
+    state = {k: v for k, v in font.__dict__.items() if k not in ("state", "face")}
+    # `_pdfScale` 是 lambda，不能序列化，加载时按 unitsPerEm 重建
+    state["face"] = {k: v for k, v in font.face.__dict__.items() if k != "_pdfScale"}
+    return state
+
+
+def _restore_font(font_name: str, state: dict[str, Any]) -> TTFont:
+    face = TTFontFace.__new__(TTFontFace)
+    face.__dict__.update(state["face"])
+    if face.unitsPerEm == 1000:
+        face._pdfScale = lambda x: x
+    else:
+        scale = 1000 / face.unitsPerEm
+        face._pdfScale = lambda x: x * scale
+
+    font = TTFont.__new__(TTFont)
+    font.__dict__.update(state)
+    font.face = face
+    font.fontName = font_name
+    font.state = WeakKeyDictionary()
+    return font
+
+
+def load_ttfont(font_name: str, font_file: str) -> TTFont:
+    """构造 `TTFont`，解析结果缓存在 `FONT_CACHE_DIR` 中。
+
+    缓存以字体文件的绝对路径区分，并记录文件大小、修改时间和 reportlab 版本，
+    任一变化都会重新解析并覆盖缓存。缓存不可用时直接解析字体文件。
+    """
+    filename, f = TTFOpenFile(font_file)
+    f.close()
+    path = osp.abspath(filename)
+    st = os.stat(path)
+    key = (Version, path, st.st_size, st.st_mtime_ns)
+    digest = hashlib.blake2b(path.encode(), digest_size=8).hexdigest()
+    cache_file = FONT_CACHE_DIR / f"{digest}.pickle"
+
+    try:
+        with open(cache_file, "rb") as fp:
+            cached_key, state = pickle.load(fp)
+        if cached_key == key:
+            return _restore_font(font_name, state)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"cannot read font cache {cache_file}: {e}")
+    except _BAD_CACHE_ERRORS:
+        # 缓存已损坏，删除后重新解析
+        with contextlib.suppress(OSError):
+            cache_file.unlink(missing_ok=True)
+
+    font = TTFont(font_name, path)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        FONT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as fp:
+            pickle.dump((key, _dump_font(font)), fp, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except (OSError, pickle.PicklingError) as e:
+        print(f"cannot write font cache {cache_file}: {e}")
+        with contextlib.suppress(OSError):
+            tmp.unlink(missing_ok=True)
+    return font
+
 
 def register_font(font_file: str, font_name: Optional[str] = None) -> str:
     if font_name is None:
         font_name = osp.basename(font_file)
     try:
-        pdfmetrics.registerFont(TTFont(font_name, font_file))
+        pdfmetrics.registerFont(load_ttfont(font_name, font_file))
         return font_name
     except TTFError as e:
         print(e)
         print(f"use default font: {DEFAULT_FONT_NAME}")
-        return DEFAULT_FONT_NAME
+        return load_font(DEFAULT_FONT_NAME)
 
 
-for font_name, font_file in FONT_DICT.items():
-    try:
-        pdfmetrics.registerFont(TTFont(font_name, font_file))
-    except TTFError:
-        pass
+@functools.cache
+def load_font(font: str) -> str:
+    """按需注册字体，返回可用于 reportlab 的字体名。
+
+    `font` 可以是 `FONT_DICT` 中的名称，也可以是字体文件路径。
+    字体只在第一次使用时解析，导入本模块不读取任何字体文件。
+    """
+    if font in pdfmetrics.getRegisteredFontNames():
+        return font
+    if font in FONT_DICT:
+        if font == DEFAULT_FONT_NAME:
+            # 默认字体注册失败时不再回退，交给 reportlab 报错
+            try:
+                pdfmetrics.registerFont(load_ttfont(font, FONT_DICT[font]))
+            except TTFError as e:
+                print(e)
+            return font
+        return register_font(FONT_DICT[font], font)
+    # 以路径作为字体名，子进程可以按同一个名字重新注册
+    return register_font(font, font)
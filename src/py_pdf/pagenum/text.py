@@ -1,50 +1,120 @@
 import io
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Sequence
 
 from pypdf import PageObject, PdfReader, Transformation
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen.canvas import Canvas
 
+from py_pdf._com import Imposer, _pdf_number
+from py_pdf._com.writer import StreamingWriter
 
-def _create_text_page(
-    width: float,
-    height: float,
-    xrate: float,
-    yrate: float,
-    text: str,
-    font_name: str,
-    font_size: int,
-) -> PageObject:
+from .font import load_font
+
+
+@dataclass(frozen=True)
+class TextSpec:
     """
     `xrate` and `yrate` are to locate the position of the text on the page,
     where is (0, 0) is the left-bottom corner of the page, and (1, 1) is the right-top corner.
     """
+
+    width: float
+    height: float
+    xrate: float
+    yrate: float
+    text: str
+    font_name: str
+    font_size: int
+
+
+def _charset(specs: Sequence[TextSpec]) -> list[tuple[str, str]]:
+    """每个字体用到的全部字符，按首次出现的顺序。"""
+    chars = dict[str, dict[str, None]]()
+    for spec in specs:
+        chars.setdefault(spec.font_name, {}).update(dict.fromkeys(spec.text))
+    return [(font_name, "".join(c)) for font_name, c in chars.items()]
+
+
+def draw_text_pages(
+    specs: Sequence[TextSpec], charset: Sequence[tuple[str, str]] = ()
+) -> bytes:
+    """在同一个 canvas 中依次绘制文字页，返回 PDF 数据。
+
+    `charset` 中的字符在绘制前按顺序登记到字体子集中。各段登记相同的字符时，
+    嵌入的字体子集、字符编码和资源名完全相同，可以互相替换。
+    """
     packet = io.BytesIO()
-    canvas_draw = Canvas(packet, pagesize=(width, height))
-    canvas_draw.setFont(font_name, font_size)
-    canvas_draw.drawCentredString(width * xrate, height * yrate, text)
+    canvas_draw = Canvas(packet)
+    for font_name, chars in charset:
+        font = pdfmetrics.getFont(load_font(font_name))
+        if isinstance(font, TTFont):
+            font.splitString(chars, canvas_draw._doc)
+    for spec in specs:
+        canvas_draw.setPageSize((spec.width, spec.height))
+        canvas_draw.setFont(load_font(spec.font_name), spec.font_size)
+        canvas_draw.drawCentredString(
+            spec.width * spec.xrate, spec.height * spec.yrate, spec.text
+        )
+        canvas_draw.showPage()
     canvas_draw.save()
+    return packet.getvalue()
 
-    text_page = PdfReader(packet).pages[0]
-    return text_page
 
+def create_text_pages(specs: Sequence[TextSpec], jobs: int = 1) -> list[PageObject]:
+    """在同一个 canvas 中绘制所有文字页，只解析一次。
+    参数相同的文字页只绘制一次，返回结果中共享同一个页面对象。
 
-def add_text(
-    page: PageObject,
+    `jobs` 大于 1 时把文字页分成 `jobs` 段，在子进程中分别绘制，只有绘制是并行的。
+    每段先登记全部字符，字体子集完全相同，合并时所有文字页改用第一段的资源，
+    输出中只嵌入一份字体子集。
+    """
+    if not specs:
+        return []
+
+    unique = list(dict.fromkeys(specs))
+    charset = _charset(unique)
+    if jobs > 1 and len(unique) > jobs:
+        size = -(-len(unique) // jobs)
+        chunks = [unique[i : i + size] for i in range(0, len(unique), size)]
+        with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as executor:
+            packets = list(
+                executor.map(draw_text_pages, chunks, [charset] * len(chunks))
+            )
+    else:
+        packets = [draw_text_pages(unique, charset)]
+
+    pages = [p for packet in packets for p in PdfReader(io.BytesIO(packet)).pages]
+    resources = pages[0].raw_get("/Resources")
+    for page in pages:
+        page[NameObject("/Resources")] = resources
+    text_pages = dict(zip(unique, pages))
+    return [text_pages[spec] for spec in specs]
+
+
+def _create_text_page(
+    width: float,
+    height: float,
     xrate: float,
     yrate: float,
     text: str,
     font_name: str,
     font_size: int,
 ) -> PageObject:
-    text_page = _create_text_page(
-        page.mediabox.width,
-        page.mediabox.height,
-        xrate,
-        yrate,
-        text,
-        font_name,
-        font_size,
-    )
+    spec = TextSpec(width, height, xrate, yrate, text, font_name, font_size)
+    return create_text_pages([spec])[0]
+
 
+def merge_text_page(page: PageObject, text_page: PageObject) -> PageObject:
     new_page = PageObject.create_blank_page(
         None, page.mediabox.width, page.mediabox.height
     )
@@ -59,3 +129,85 @@ def add_text(
     )
 
     return new_page
+
+
+class Stamper:
+    """把文字页作为 Form XObject 叠加到原页面上。
+
+    原页面的内容流原样保留，只在前后各加一个很短的内容流：
+    `q` 隔离原内容的图形状态，`Q q ... cm /PageNum Do Q` 绘制文字。
+    资源字典浅复制后只多一个 XObject 条目，不需要重命名字体等资源。
+    """
+
+    def __init__(self, writer: StreamingWriter):
+        self.imposer = Imposer(writer)
+        self.push = writer.add_object(_content_stream(b"q\n"))
+
+    def stamp(self, page: PageObject, text_page: PageObject) -> PageObject:
+        form = self.imposer.form(text_page)
+        if form is None:
+            return page
+
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+        xobjects = resources.get("/XObject")
+        xobjects = xobjects.get_object() if xobjects is not None else {}
+
+        name = "/PageNum"
+        while name in xobjects:
+            name += "_"
+
+        new_xobjects = DictionaryObject(
+            {NameObject(k): xobjects.raw_get(k) for k in xobjects}
+        )
+        new_xobjects[NameObject(name)] = form
+        new_resources = DictionaryObject(
+            {NameObject(k): resources.raw_get(k) for k in resources}
+        )
+        new_resources[NameObject("/XObject")] = new_xobjects
+
+        box = page.mediabox
+        pop = _content_stream(
+            f"Q\nq 1 0 0 1 {_pdf_number(box.left)} {_pdf_number(box.bottom)} cm "
+            f"{name} Do Q\n".encode()
+        )
+        contents = page.raw_get("/Contents") if "/Contents" in page else None
+        if contents is None:
+            contents = ArrayObject()
+        elif isinstance(contents.get_object(), ArrayObject):
+            contents = ArrayObject(contents.get_object())
+        else:
+            contents = ArrayObject([contents])
+
+        new_page = PageObject()
+        for k in page:
+            new_page[NameObject(k)] = page.raw_get(k)
+        new_page[NameObject("/Resources")] = new_resources
+        new_page[NameObject("/Contents")] = ArrayObject([self.push, *contents, pop])
+        return new_page
+
+
+def _content_stream(data: bytes) -> DecodedStreamObject:
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def add_text(
+    page: PageObject,
+    xrate: float,
+    yrate: float,
+    text: str,
+    font_name: str,
+    font_size: int,
+) -> PageObject:
+    text_page = _create_text_page(
+        page.mediabox.width,
+        page.mediabox.height,
+        xrate,
+        yrate,
+        text,
+        font_name,
+        font_size,
+    )
+    return merge_text_page(page, text_page)
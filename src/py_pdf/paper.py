@@ -7,55 +7,82 @@
 import argparse
 from pathlib import Path
 
-from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf import PageObject, PdfReader
 
-from ._com import crop_page, merge_two_pages, new_path_with_timestamp
+from ._com import Imposer, crop_page, new_path_with_timestamp
+from ._com.profile import DEFAULT_PROFILE, PROFILES, OutputProfile, finish
+from ._com.qpdf import BACKENDS, make_two_up, split_two_up
+from ._com.writer import StreamingWriter
 
 
 def make_paper(
-    input_pdf_path: Path | str, output_pdf_path: Path | str, vertical: bool = True
+    input_pdf_path: Path | str,
+    output_pdf_path: Path | str,
+    vertical: bool = True,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    backend: str = "pypdf",
 ) -> Path:
-    reader = PdfReader(input_pdf_path)
-
-    pages = list(reader.pages)
-    if len(pages) % 2 != 0:
-        blank_page = PageObject.create_blank_page(
-            None, pages[0].mediabox.width, pages[0].mediabox.height
-        )
-        pages.append(blank_page)
-
-    # 此时页面数量为 2 的倍数，迭代器不会 StopIteration
-    pages = iter(pages)
-    new_pages = (merge_two_pages(i, next(pages), vertical) for i in pages)
-
-    writer = PdfWriter()
-    for page in new_pages:
-        writer.add_page(page)
-
-    with open(output_pdf_path, "wb") as output_file:
-        writer.write(output_file)
-    writer.close()
-    reader.close()
-
+    if backend == "pikepdf":
+        make_two_up(input_pdf_path, output_pdf_path, vertical, False, profile)
+        return Path(output_pdf_path)
+
+    # 以文件对象打开，pypdf 不会把整个文件读入内存；合并后的页面逐张写出
+    with (
+        open(input_pdf_path, "rb") as input_file,
+        open(output_pdf_path, "wb") as output_file,
+    ):
+        reader = PdfReader(input_file)
+
+        pages = list(reader.pages)
+        if len(pages) % 2 != 0:
+            blank_page = PageObject.create_blank_page(
+                None, pages[0].mediabox.width, pages[0].mediabox.height
+            )
+            pages.append(blank_page)
+
+        writer = StreamingWriter(output_file, profile.dedupe)
+        imposer = Imposer(writer)
+
+        # 此时页面数量为 2 的倍数，迭代器不会 StopIteration
+        pages = iter(pages)
+        for page in pages:
+            writer.add_page(imposer.merge_two_pages(page, next(pages), vertical))
+
+        writer.close()
+        reader.close()
+
+    finish(output_pdf_path, profile)
     return Path(output_pdf_path)
 
 
 def split_paper(
-    input_pdf_path: Path | str, output_pdf_path: Path | str, vertical: bool = True
+    input_pdf_path: Path | str,
+    output_pdf_path: Path | str,
+    vertical: bool = True,
+    hard: bool = False,
+    profile: OutputProfile = DEFAULT_PROFILE,
+    backend: str = "pypdf",
 ) -> Path:
-    reader = PdfReader(input_pdf_path)
+    if backend == "pikepdf":
+        split_two_up(input_pdf_path, output_pdf_path, vertical, False, hard, profile)
+        return Path(output_pdf_path)
 
-    pages = (p for page in reader.pages for p in crop_page(page, vertical))
+    with (
+        open(input_pdf_path, "rb") as input_file,
+        open(output_pdf_path, "wb") as output_file,
+    ):
+        reader = PdfReader(input_file)
 
-    writer = PdfWriter()
-    for page in pages:
-        writer.add_page(page)
+        pages = (p for page in reader.pages for p in crop_page(page, vertical, hard))
 
-    with open(output_pdf_path, "wb") as output_file:
-        writer.write(output_file)
-    writer.close()
-    reader.close()
+        writer = StreamingWriter(output_file, profile.dedupe)
+        for page in pages:
+            writer.add_page(page)
 
+        writer.close()
+        reader.close()
+
+    finish(output_pdf_path, profile)
     return Path(output_pdf_path)
 
 
@@ -67,6 +94,24 @@ def main():
     )
     parser.add_argument("input_pdf_path", type=Path, help="输入PDF文件路径")
     parser.add_argument("-x", "--horizontal", action="store_true", help="横向分割/合并")
+    parser.add_argument(
+        "--hard",
+        action="store_true",
+        help="分割时删除完全落在半页外的图片，而不只是隐藏。\n"
+        "跨越中线的图片（如整页扫描）原样保留，输出不会变小",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILES,
+        default="fast",
+        help="输出配置：fast 直接写出，compact 体积最小，web 线性化",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="pypdf",
+        help="拼版后端：pypdf 或 pikepdf（qpdf，速度更快）",
+    )
     cmd_grp = parser.add_mutually_exclusive_group()
     cmd_grp.add_argument("--make", action="store_true", help="将PDF文档转换为试卷")
     cmd_grp.add_argument("--split", action="store_true", help="将PDF试卷分割为文档")
@@ -76,12 +121,26 @@ def main():
     input_pdf_path: Path = args.input_pdf_path
     horizontal: bool = args.horizontal
     output_pdf_path = new_path_with_timestamp(input_pdf_path)
+    profile = PROFILES[args.profile]
 
     try:
         if args.make:
-            make_paper(input_pdf_path, output_pdf_path, vertical=not horizontal)
+            make_paper(
+                input_pdf_path,
+                output_pdf_path,
+                vertical=not horizontal,
+                profile=profile,
+                backend=args.backend,
+            )
         elif args.split:
-            split_paper(input_pdf_path, output_pdf_path, vertical=not horizontal)
+            split_paper(
+                input_pdf_path,
+                output_pdf_path,
+                vertical=not horizontal,
+                hard=args.hard,
+                profile=profile,
+                backend=args.backend,
+            )
         else:
             parser.print_help()
     except Exception as e:
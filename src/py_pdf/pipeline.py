@@ -0,0 +1,314 @@
+"""PDF 流水线工具。
+
+按配方文件依次执行添加页码、设置大纲、小册子/试卷合并或分割等操作。
+文档只读取一次，所有操作在内存中完成，最后只写出一次，不产生中间文件。
+大纲的目标页会随合并、分割和重排一起换算。
+"""
+
+import argparse
+import copy
+import functools
+import tomllib
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Optional, Sequence
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    TextStringObject,
+)
+
+from ._com import (
+    Imposer,
+    crop_page,
+    new_path_with_timestamp,
+    sort_from_booklet,
+    sort_to_booklet,
+)
+from ._com.profile import DEFAULT_PROFILE, OutputProfile, finish, get_profile
+from ._com.writer import StreamingWriter
+from .outline.parser import CompactOutline
+from .pagenum.config import Config, normalize_keys
+from .pagenum.core import _add_pagenum, page_labels, resolve_page_range
+from .pagenum.text import Stamper
+
+recipe_template = """\
+# 输出配置：fast 直接写出，compact 体积最小，web 线性化
+profile = "fast"
+
+# 每个 [[steps]] 是一步操作，按顺序执行
+
+# 添加页码，其余配置项与 addpn 的 config.toml 相同
+[[steps]]
+op = "addpn"
+num_fmt = "{:d}"
+
+# 设置大纲，页码是执行这一步时的页码，之后的合并、分割会自动换算
+[[steps]]
+op = "outline"
+file = "outline.txt"
+offset = 0
+
+# 小册子（booklet）或试卷（paper），action 为 make 或 split
+[[steps]]
+op = "booklet"
+action = "make"
+horizontal = false
+# 分割时删除完全落在半页外的图片，跨越中线的图片（如整页扫描）原样保留
+hard = false
+"""
+
+
+class Document:
+    """流水线中的文档：页面列表、大纲和页面标签。
+
+    大纲的页码是 `pages` 的下标（从 0 开始），页面变化时由 `remap` 换算。
+    """
+
+    def __init__(self, pages: Sequence[PageObject], writer: StreamingWriter):
+        self.pages = list(pages)
+        self.writer = writer
+        self.imposer = Imposer(writer)
+        self.stamper: Optional[Stamper] = None
+        self.outline: Optional[CompactOutline] = None
+        self.labels: Optional[DictionaryObject] = None
+
+    def remap(self, pages: list[PageObject], index_map: Sequence[int]):
+        """替换页面列表，`index_map[i]` 是原第 i 页在新列表中的下标。"""
+        if self.labels is not None:
+            raise ValueError("page labels must be set after imposition")
+        if self.outline is not None:
+            for i, page in enumerate(self.outline.pages):
+                self.outline.pages[i] = index_map[page]
+        self.pages = pages
+
+    def _pad(self, multiple: int) -> int:
+        n = len(self.pages)
+        if (r := n % multiple) != 0:
+            blank_page = PageObject.create_blank_page(
+                None, self.pages[0].mediabox.width, self.pages[0].mediabox.height
+            )
+            self.pages.extend([blank_page] * (multiple - r))
+        return n
+
+    def make(self, booklet: bool, vertical: bool):
+        n = self._pad(4 if booklet else 2)
+        order = list(range(len(self.pages)))
+        if booklet:
+            order = sort_to_booklet(order)
+        merged = [
+            self.imposer.merge_two_pages(
+                self.pages[order[i]], self.pages[order[i + 1]], vertical
+            )
+            for i in range(0, len(order), 2)
+        ]
+        index_map = [0] * len(order)
+        for k, i in enumerate(order):
+            index_map[i] = k // 2
+        self.remap(merged, index_map[:n])
+
+    def split(self, booklet: bool, vertical: bool, hard: bool):
+        halves = [p for page in self.pages for p in crop_page(page, vertical, hard)]
+        order = list(range(len(halves)))
+        if booklet:
+            order = sort_from_booklet(order)
+        position = [0] * len(order)
+        for k, i in enumerate(order):
+            position[i] = k
+        # 书签指向原页面两个半页中靠前的一页
+        index_map = [
+            min(position[2 * i], position[2 * i + 1]) for i in range(len(self.pages))
+        ]
+        self.remap([halves[i] for i in order], index_map)
+
+    def add_pagenum(self, config: Config, jobs: int = 1):
+        page_range = resolve_page_range(config, len(self.pages))
+        if config.page_labels:
+            self.labels = page_labels(config, page_range, len(self.pages))
+            return
+        if config.stamp and self.stamper is None:
+            self.stamper = Stamper(self.writer)
+        stamper = self.stamper if config.stamp else None
+        self.pages = _add_pagenum(config, page_range, self.pages, stamper, jobs)
+
+    def set_outline(self, outline: CompactOutline, page_offset: int = 0):
+        pages = array("q")
+        for page in outline.pages:
+            page += page_offset - 1
+            if not 0 <= page < len(self.pages):
+                raise ValueError(
+                    f"page index out of range: {page} >= {len(self.pages)}"
+                )
+            pages.append(page)
+        # 只复制页码数组，标题等与配方共享
+        self.outline = copy.copy(outline)
+        self.outline.pages = pages
+
+    def _write_outline(self):
+        """与 `outline.core.write_outline` 相同的结构，用 pypdf 对象写出。"""
+        add = self.writer.add_object
+        root = DictionaryObject({NameObject("/Type"): NameObject("/Outlines")})
+        root_ref = add(root)
+        # (字典, 引用, 层级, 最后一个子节点 (字典, 引用), 子孙数)
+        stack: list[list[Any]] = [[root, root_ref, 0, None, 0]]
+
+        def close(node: list[Any]):
+            item, _, _, last, count = node
+            if last is not None:
+                item[NameObject("/Last")] = last[1]
+            item[NameObject("/Count")] = NumberObject(count)
+
+        kids = self.writer.kids
+        for level, title, page in self.outline:
+            while level <= stack[-1][2]:
+                close(stack.pop())
+            parent = stack[-1]
+            item = DictionaryObject(
+                {
+                    NameObject("/Title"): TextStringObject(title),
+                    NameObject("/Parent"): parent[1],
+                    NameObject("/Dest"): ArrayObject([kids[page], NameObject("/Fit")]),
+                }
+            )
+            ref = add(item)
+            if parent[3] is None:
+                parent[0][NameObject("/First")] = ref
+            else:
+                parent[3][0][NameObject("/Next")] = ref
+                item[NameObject("/Prev")] = parent[3][1]
+            parent[3] = (item, ref)
+            for node in stack:
+                node[4] += 1
+            stack.append([item, ref, level, None, 0])
+
+        while stack:
+            close(stack.pop())
+        self.writer.catalog[NameObject("/Outlines")] = root_ref
+
+    def save(self):
+        for page in self.pages:
+            self.writer.add_page(page)
+        if self.outline is not None:
+            self._write_outline()
+        if self.labels is not None:
+            self.writer.catalog[NameObject("/PageLabels")] = self.labels
+        self.writer.close()
+
+
+Step = Callable[[Document], None]
+
+
+def _impose_step(step: dict[str, Any]) -> Step:
+    booklet = step["op"] == "booklet"
+    vertical = not step.get("horizontal", False)
+    match step.get("action", "make"):
+        case "make":
+            return functools.partial(Document.make, booklet=booklet, vertical=vertical)
+        case "split":
+            return functools.partial(
+                Document.split,
+                booklet=booklet,
+                vertical=vertical,
+                hard=step.get("hard", False),
+            )
+        case action:
+            raise ValueError(f"unknown action: {action}")
+
+
+def parse_recipe(
+    recipe_str: str, base: Path = Path("."), jobs: int = 1
+) -> tuple[list[Step], OutputProfile]:
+    """解析配方，返回操作列表和输出配置。相对路径相对于 `base`。"""
+    recipe = tomllib.loads(recipe_str)
+    steps = list[Step]()
+    for step in recipe.get("steps", []):
+        step = dict(step)
+        match step.get("op"):
+            case "addpn":
+                del step["op"]
+                config = Config.from_dict(normalize_keys(step))
+                steps.append(
+                    functools.partial(Document.add_pagenum, config=config, jobs=jobs)
+                )
+            case "outline":
+                with open(base / step["file"], "r", encoding="utf-8") as f:
+                    outline = CompactOutline.from_lines(f)
+                steps.append(
+                    functools.partial(
+                        Document.set_outline,
+                        outline=outline,
+                        page_offset=step.get("offset", 0),
+                    )
+                )
+            case "booklet" | "paper":
+                steps.append(_impose_step(step))
+            case op:
+                raise ValueError(f"unknown step: {op}")
+    return steps, get_profile(recipe.get("profile", "fast"))
+
+
+def run_pipeline(
+    input_path: Path | str,
+    output_path: Path | str,
+    steps: Sequence[Step],
+    profile: OutputProfile = DEFAULT_PROFILE,
+) -> Path:
+    with (
+        open(input_path, "rb") as input_file,
+        open(output_path, "wb") as output_file,
+    ):
+        reader = PdfReader(input_file)
+        doc = Document(reader.pages, StreamingWriter(output_file, profile.dedupe))
+        for step in steps:
+            step(doc)
+        doc.save()
+        reader.close()
+
+    finish(output_path, profile)
+    return Path(output_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog=Path(__file__).name.removesuffix(".py"),
+        description=__doc__,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("input_pdf_path", type=Path, help="输入PDF文件路径")
+    parser.add_argument(
+        "recipe_path",
+        type=Path,
+        nargs="?",
+        default=Path("recipe.toml"),
+        help="配方文件路径，不存在时生成模板",
+    )
+    parser.add_argument("-o", "--output", type=Path, help="输出PDF文件路径")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="绘制页码的进程数")
+
+    args = parser.parse_args()
+
+    recipe_path: Path = args.recipe_path
+    if not recipe_path.exists():
+        recipe_path.write_text(recipe_template, encoding="utf-8")
+        print(f"Config and then run again: {recipe_path}")
+        return
+
+    input_pdf_path: Path = args.input_pdf_path
+    output_pdf_path = args.output or new_path_with_timestamp(input_pdf_path)
+
+    try:
+        steps, profile = parse_recipe(
+            recipe_path.read_text(encoding="utf-8"), recipe_path.parent, args.jobs
+        )
+        run_pipeline(input_pdf_path, output_pdf_path, steps, profile)
+        print(f"save as\n{output_pdf_path}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
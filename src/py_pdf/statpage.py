@@ -1,14 +1,37 @@
 """统计PDF文件数目和页数，支持输入文件和目录。
 输入目录时默认搜索所有子目录：`glob: **/*.pdf`
+使用 `--jobs N` 时并发遍历目录，并用 N 个进程读取文件。
+使用 `--cache FILE` 时把结果缓存到 SQLite 文件，再次运行只读取新增或修改的文件。
+使用 `--timeout` / `--max-rss` 时每个文件在独立进程中读取，超限的进程会被终止并记录。
 """
 
 import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from dataclasses import dataclass
+from fnmatch import fnmatch
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from multiprocessing.connection import wait as wait_connections
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Iterable, Iterator, Optional
 
 from pypdf import PdfReader
 
+from ._com.pagecount import PageCountError, count_pages
+
 
 @dataclass
 class PathAndCount:
@@ -16,15 +39,319 @@ class PathAndCount:
     count: int
 
 
-def read_pdf(path: Path) -> Optional[PathAndCount]:
+@dataclass
+class SkippedFile:
+    path: Path
+    reason: str
+
+
+@dataclass
+class Budget:
+    """单个文件的资源上限，`None` 表示不限制。"""
+
+    timeout: Optional[float] = None  # 秒
+    max_rss: Optional[int] = None  # 字节
+
+
+def _read(path: Path) -> PathAndCount | SkippedFile:
+    """优先只读取 trailer 和根 `/Pages /Count`，失败时回退到完整解析。"""
     try:
-        reader = PdfReader(path)
-        return PathAndCount(path, len(reader.pages))
+        try:
+            count = count_pages(path)
+        except PageCountError:
+            count = len(PdfReader(path).pages)
+        return PathAndCount(path, count)
     except Exception as e:
         print(f"Error reading {path}: {e}")
+        return SkippedFile(path, f"error: {e}")
+
+
+def read_pdf(path: Path) -> Optional[PathAndCount]:
+    res = _read(path)
+    if isinstance(res, PathAndCount):
+        return res
+
+
+def _scan_dir(path: Path) -> tuple[list[Path], list[Path]]:
+    """扫描单个目录，返回其中的 PDF 文件和子目录。
+    与 `glob: **/*.pdf` 一致：不进入符号链接目录，忽略无权限的目录。
+    """
+    files = list[Path]()
+    dirs = list[Path]()
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(path / entry.name)
+                    elif fnmatch(entry.name, "*.pdf") and entry.is_file():
+                        files.append(path / entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, dirs
+
+
+def walk_pdf(root: Path, executor: Executor) -> Iterator[Path]:
+    """并发遍历目录树，每个目录作为一个任务提交给 `executor`。"""
+    pending = {executor.submit(_scan_dir, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            files, dirs = future.result()
+            yield from files
+            pending.update(executor.submit(_scan_dir, d) for d in dirs)
+
+
+def _read_parallel(
+    files: Iterable[Path], jobs: int
+) -> Iterator[PathAndCount | SkippedFile]:
+    """在进程池中读取文件，按完成顺序返回结果。
+    同时在途的任务数有上限，文件列表不会一次性全部提交。
+    目录遍历线程与进程池同时运行，因此使用 spawn 而不是 fork 启动子进程。
+    """
+    max_pending = jobs * 4
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn")) as executor:
+        pending = set[Future[PathAndCount | SkippedFile]]()
+        for path in files:
+            pending.add(executor.submit(_read, path))
+            if len(pending) < max_pending:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        for future in wait(pending).done:
+            yield future.result()
+
+
+def _rss(pid: int) -> Optional[int]:
+    """读取进程的常驻内存（字节），目前只支持 Linux。"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _isolated_worker(conn: Connection):
+    conn.send(None)  # 通知主进程已完成导入
+    while (path := conn.recv()) is not None:
+        conn.send(_read(path))
+
+
+class _IsolatedWorker:
+    def __init__(self):
+        ctx = get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_isolated_worker, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.path: Optional[Path] = None
+        self.start = 0.0
+
+    def wait_ready(self):
+        self.conn.recv()
+
+    def submit(self, path: Path):
+        self.path = path
+        self.start = time.monotonic()
+        self.conn.send(path)
+
+    def over_budget(self, budget: Budget) -> Optional[str]:
+        if budget.timeout is not None:
+            if time.monotonic() - self.start > budget.timeout:
+                return f"timeout: > {budget.timeout}s"
+        if budget.max_rss is not None:
+            rss = _rss(self.process.pid)  # type: ignore
+            if rss is not None and rss > budget.max_rss:
+                return f"memory: {rss} > {budget.max_rss} bytes"
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+_POLL_INTERVAL = 0.05
+
+
+def _read_isolated(
+    files: Iterable[Path], jobs: int, budget: Budget
+) -> Iterator[PathAndCount | SkippedFile]:
+    """每个工作进程一次只读一个文件。超时、超出内存上限或崩溃的进程被终止，
+    对应文件记为 `SkippedFile`，并启动新进程替代。
+    """
+    if budget.max_rss is not None and _rss(os.getpid()) is None:
+        print(f"Warning: --max-rss is not supported on {sys.platform}")
+
+    workers = [_IsolatedWorker() for _ in range(max(1, jobs))]
+    for worker in workers:
+        worker.wait_ready()
+
+    files = iter(files)
+    exhausted = False
+    try:
+        while True:
+            for worker in workers:
+                if worker.path is None and not exhausted:
+                    if (path := next(files, None)) is None:
+                        exhausted = True
+                    else:
+                        worker.submit(path)
+            busy = [w for w in workers if w.path is not None]
+            if not busy:
+                return
+
+            ready = wait_connections([w.conn for w in busy], _POLL_INTERVAL)
+            for worker in busy:
+                path = worker.path
+                assert path is not None
+                if worker.conn in ready:
+                    try:
+                        yield worker.conn.recv()
+                        worker.path = None
+                        continue
+                    except EOFError:
+                        reason = f"crashed: exit code {worker.process.exitcode}"
+                elif (reason := worker.over_budget(budget)) is None:
+                    continue
+
+                worker.kill()
+                i = workers.index(worker)
+                workers[i] = _IsolatedWorker()
+                workers[i].wait_ready()
+                yield SkippedFile(path, reason)
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+class StatCache:
+    """以 (path, size, mtime, inode) 为键的页数缓存，保存在 SQLite 文件中。
+
+    `path` 为绝对路径。扫描结束后，扫描范围内本次未出现的文件会被删除。
+    """
+
+    def __init__(self, db_path: Path | str):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                count INTEGER NOT NULL
+            )"""
+        )
+        self.seen = set[str]()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    @staticmethod
+    def _key(path: Path) -> tuple[str, int, int, int]:
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns, st.st_ino
+
+    def get(self, path: Path) -> Optional[int]:
+        try:
+            key = self._key(path)
+        except OSError:
+            return None
+        self.seen.add(key[0])
+        row = self.conn.execute(
+            "SELECT count FROM pages"
+            " WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+            key,
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, item: PathAndCount):
+        try:
+            key = self._key(item.path)
+        except OSError:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+            (*key, item.count),
+        )
+
+    def prune(self, roots: Iterable[Path]):
+        """删除 `roots` 范围内本次扫描未出现的记录。"""
+        for root in roots:
+            root = os.path.abspath(root)
+            prefix = os.path.join(root, "")
+            rows = self.conn.execute(
+                "SELECT path FROM pages WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root, len(prefix), prefix),
+            ).fetchall()
+            self.conn.executemany(
+                "DELETE FROM pages WHERE path = ?",
+                [row for row in rows if row[0] not in self.seen],
+            )
+        self.conn.commit()
+
+
+def _stat_cached(
+    files: Iterable[Path],
+    read: Callable[[Iterable[Path]], Iterable[PathAndCount | SkippedFile]],
+    cache: StatCache,
+    roots: Iterable[Path],
+) -> Iterator[PathAndCount | SkippedFile]:
+    hits = deque[PathAndCount]()
+
+    def misses():
+        for path in files:
+            count = cache.get(path)
+            if count is None:
+                yield path
+            else:
+                hits.append(PathAndCount(path, count))
 
+    for item in read(misses()):
+        while hits:
+            yield hits.popleft()
+        if isinstance(item, PathAndCount):
+            cache.put(item)
+        yield item
+    while hits:
+        yield hits.popleft()
+
+    cache.prune(roots)
+
+
+def stat_pdf(
+    paths: Iterable[Path],
+    jobs: int = 1,
+    cache: Optional[StatCache] = None,
+    budget: Optional[Budget] = None,
+    skipped: Optional[list[SkippedFile]] = None,
+) -> Iterable[PathAndCount]:
+    """`jobs > 1` 时结果按完成顺序返回，顺序与串行不同，但总数一致。
+    读取失败、超时或超出内存上限的文件不计入结果，而是追加到 `skipped`。
+    """
+    paths = list(paths)
 
-def stat_pdf(paths: Iterable[Path]) -> Iterable[PathAndCount]:
     def chain_files():
         for path in paths:
             if path.is_file():
@@ -32,8 +359,39 @@ def stat_pdf(paths: Iterable[Path]) -> Iterable[PathAndCount]:
             else:
                 yield from path.glob("**/*.pdf")
 
-    res = filter(None, map(read_pdf, chain_files()))
-    return res
+    def chain_files_parallel():
+        with ThreadPoolExecutor(jobs) as executor:
+            for path in paths:
+                if path.is_file():
+                    yield path
+                else:
+                    yield from walk_pdf(path, executor)
+
+    def read_parallel(files: Iterable[Path]):
+        return _read_parallel(files, jobs)
+
+    def read_isolated(files: Iterable[Path]):
+        assert budget is not None
+        return _read_isolated(files, jobs, budget)
+
+    files = chain_files() if jobs <= 1 else chain_files_parallel()
+    if budget is not None:
+        read = read_isolated
+    elif jobs <= 1:
+        read = partial(map, _read)
+    else:
+        read = read_parallel
+
+    if cache is None:
+        items = read(files)
+    else:
+        items = _stat_cached(files, read, cache, paths)
+
+    for item in items:
+        if isinstance(item, PathAndCount):
+            yield item
+        elif skipped is not None:
+            skipped.append(item)
 
 
 def print_result(result: Iterable[PathAndCount]):
@@ -57,6 +415,16 @@ def print_result_verbose(result: Iterable[PathAndCount]):
     print(f"Total pages: {page_count}")
 
 
+def print_skipped(skipped: Iterable[SkippedFile], verbose: bool = False):
+    skipped = list(skipped)
+    if len(skipped) == 0:
+        return
+    if verbose:
+        for item in skipped:
+            print(f"{item.reason}    {item.path}")
+    print(f"Skipped files: {len(skipped)}")
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog=Path(__file__).name.removesuffix(".py"),
@@ -67,18 +435,39 @@ def main():
     parser.add_argument(
         "-v", "--verbose", action="store_true", help="Show verbose output"
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="Number of worker processes"
+    )
+    parser.add_argument("--cache", type=Path, help="SQLite cache file")
+    parser.add_argument("--timeout", type=float, help="Per-file time limit in seconds")
+    parser.add_argument("--max-rss", type=int, help="Per-file memory limit in MB")
     args = parser.parse_args()
     paths: list[Path] = args.path
     verbose: bool = args.verbose
+    jobs: int = args.jobs
+    cache_path: Optional[Path] = args.cache
+    timeout: Optional[float] = args.timeout
+    max_rss: Optional[int] = args.max_rss
 
     if len(paths) == 0:
         paths = [Path.cwd()]
 
-    res = stat_pdf(paths)
-    if verbose:
-        print_result_verbose(res)
-    else:
-        print_result(res)
+    budget = None
+    if timeout is not None or max_rss is not None:
+        budget = Budget(timeout, None if max_rss is None else max_rss << 20)
+
+    skipped = list[SkippedFile]()
+    cache = None if cache_path is None else StatCache(cache_path)
+    try:
+        res = stat_pdf(paths, jobs, cache, budget, skipped)
+        if verbose:
+            print_result_verbose(res)
+        else:
+            print_result(res)
+        print_skipped(skipped, verbose)
+    finally:
+        if cache is not None:
+            cache.close()
 
 
 if __name__ == "__main__":
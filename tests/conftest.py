@@ -0,0 +1,15 @@
+from pathlib import Path
+
+import pytest
+
+from py_pdf.pagenum import font
+
+
+@pytest.fixture(autouse=True)
+def font_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """字体缓存写到临时目录，不碰用户的 ~/.cache。子进程通过环境变量继承。"""
+    cache_home = tmp_path / "xdg-cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    cache_dir = cache_home / "py_pdf" / "fonts"
+    monkeypatch.setattr(font, "FONT_CACHE_DIR", cache_dir)
+    return cache_dir
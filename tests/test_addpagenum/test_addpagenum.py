@@ -1,7 +1,19 @@
+import os
+import shutil
+import subprocess
+import sys
 from pathlib import Path
 
+import pikepdf
+import pytest
+from pypdf import PdfReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFOpenFile
+
+from py_pdf.pagenum import cli, font
 from py_pdf.pagenum.config import cfg_template
 from py_pdf.pagenum.core import add_pagenum
+from py_pdf.pagenum.text import TextSpec, create_text_pages
 
 this_dir = Path(__file__).parent
 
@@ -84,3 +96,171 @@ def test_9():
         this_dir / "test_9.pdf",
         """num-pos = { x=0.0625, y=0.9375, mode = 'stagger' }""",
     )
+
+
+def test_create_text_pages():
+    specs = [
+        TextSpec(595, 842, 0.5, 0.0625, text, "Times New Roman", 16)
+        for text in ("1", "2", "1")
+    ]
+    pages = create_text_pages(specs)
+    assert [p.extract_text().strip() for p in pages] == ["1", "2", "1"]
+    assert pages[0] is pages[2]
+    assert create_text_pages([]) == []
+
+
+def test_stamp(tmp_path):
+    original = PdfReader("tests/sample/A4.pdf").pages[0]
+    texts = []
+    for stamp in ("true", "false"):
+        output = tmp_path / f"{stamp}.pdf"
+        add_pagenum("tests/sample/A4.pdf", output, f"stamp={stamp}")
+        page = PdfReader(output).pages[0]
+        texts.append(page.extract_text())
+        if stamp == "true":
+            push, content, pop = page["/Contents"]
+            assert push.get_object().get_data() == b"q\n"
+            assert content.get_object().get_data() == original.get_contents().get_data()
+            assert b"/PageNum Do" in pop.get_object().get_data()
+    assert texts[0] == texts[1] != original.extract_text()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_shared_font(tmp_path, jobs):
+    # 所有页码共用同一个嵌入字体子集，分段并行绘制时也是如此
+    output = tmp_path / "font.pdf"
+    add_pagenum("tests/sample/A4.pdf", output, "num-fmt = '第{:d}页'", jobs=jobs)
+    fonts = set()
+    for page in PdfReader(output).pages:
+        xobjects = page["/Resources"].get("/XObject", {})
+        if "/PageNum" not in xobjects:
+            continue
+        for ref in xobjects["/PageNum"]["/Resources"]["/Font"].values():
+            fonts.add(ref.idnum)
+    assert len(fonts) == 2  # reportlab 的默认字体 + 页码字体
+
+
+def test_lazy_font():
+    code = (
+        "import sys\n"
+        "import py_pdf.pagenum.cli\n"
+        "assert 'pikepdf' not in sys.modules\n"
+        "from reportlab.pdfbase import pdfmetrics\n"
+        "assert '楷体' not in pdfmetrics.getRegisteredFontNames()\n"
+        "from py_pdf.pagenum.font import load_font\n"
+        "assert load_font('楷体') == '楷体'\n"
+        "assert '楷体' in pdfmetrics.getRegisteredFontNames()\n"
+        "assert '宋体' not in pdfmetrics.getRegisteredFontNames()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_font_cache(tmp_path, font_cache):
+    font_file = tmp_path / "font.ttf"
+    shutil.copy(TTFOpenFile("times.ttf")[0], font_file)
+
+    parsed = font.load_ttfont("parsed", str(font_file))
+    cache_files = list(font_cache.iterdir())
+    assert len(cache_files) == 1
+    mtime = cache_files[0].stat().st_mtime_ns
+
+    cached = font.load_ttfont("cached", str(font_file))
+    assert cached.fontName == "cached"
+    assert cached.face.charWidths == parsed.face.charWidths
+    assert cached.stringWidth("第12页", 16) == parsed.stringWidth("第12页", 16)
+    assert cache_files[0].stat().st_mtime_ns == mtime
+
+    pdfmetrics.registerFont(cached)
+    [page] = create_text_pages([TextSpec(100, 100, 0.5, 0.5, "12", "cached", 16)])
+    assert page.extract_text().strip() == "12"
+
+    # 字体文件变化后缓存失效
+    os.utime(font_file, ns=(0, 0))
+    font.load_ttfont("parsed", str(font_file))
+    assert cache_files[0].stat().st_mtime_ns != mtime
+
+
+def test_font_cache_corrupt(tmp_path, font_cache):
+    # 损坏的缓存被删除后重新生成
+    font_file = tmp_path / "font.ttf"
+    shutil.copy(TTFOpenFile("times.ttf")[0], font_file)
+    font.load_ttfont("parsed", str(font_file))
+    [cache_file] = font_cache.iterdir()
+    cache_file.write_bytes(b"not a pickle")
+
+    cached = font.load_ttfont("cached", str(font_file))
+    assert cached.fontName == "cached"
+    assert cache_file.read_bytes() != b"not a pickle"
+    assert font.load_ttfont("again", str(font_file)).fontName == "again"
+
+
+def test_jobs(tmp_path):
+    config = "page_range = '1-3:1,5-9:12'\nnum-pos = { mode = 'stagger' }"
+    serial, parallel = tmp_path / "serial.pdf", tmp_path / "parallel.pdf"
+    add_pagenum("tests/sample/A4.pdf", serial, config)
+    add_pagenum("tests/sample/A4.pdf", parallel, config, jobs=3)
+    for page1, page2 in zip(PdfReader(serial).pages, PdfReader(parallel).pages):
+        assert page1.extract_text() == page2.extract_text()
+        if "/XObject" in page1["/Resources"]:
+            form1 = page1["/Resources"]["/XObject"]["/PageNum"]
+            form2 = page2["/Resources"]["/XObject"]["/PageNum"]
+            assert form1.get_data() == form2.get_data()
+
+
+def test_page_labels(tmp_path):
+    output = tmp_path / "labels.pdf"
+    config = "page_range = '1-3:1,5-9:12'\npage-labels = true\n"
+    add_pagenum("tests/sample/A4.pdf", output, config + "num-fmt = 'p{:d}'")
+    reader = PdfReader(output)
+    assert reader.page_labels == [
+        *("p1", "p2", "p3", "4"),
+        *("p12", "p13", "p14", "p15", "p16", "10"),
+    ]
+    assert len(reader.trailer["/Root"]["/PageLabels"]["/Nums"]) == 8
+    # 原页面内容不变
+    original = PdfReader("tests/sample/A4.pdf").pages[0]
+    assert (
+        reader.pages[0].get_contents().get_data() == original.get_contents().get_data()
+    )
+
+    add_pagenum("tests/sample/A4.pdf", output, config + "num-fmt = '第{:d}页'")
+    assert PdfReader(output).page_labels[:5] == [
+        "第1页",
+        "第2页",
+        "第3页",
+        "4",
+        "第12页",
+    ]
+
+
+def test_incremental(tmp_path):
+    original = Path("tests/sample/A4.pdf").read_bytes()
+    for config in ("stamp = true", "stamp = false", "page-labels = true"):
+        full = tmp_path / "full.pdf"
+        output = tmp_path / "incremental.pdf"
+        add_pagenum("tests/sample/A4.pdf", full, config)
+        add_pagenum("tests/sample/A4.pdf", output, config, incremental=True)
+        # 原文件的字节原样保留，只在后面追加
+        assert output.read_bytes().startswith(original)
+        expected = PdfReader(full)
+        reader = PdfReader(output)
+        assert reader.page_labels == expected.page_labels
+        assert [p.extract_text() for p in reader.pages] == [
+            p.extract_text() for p in expected.pages
+        ]
+
+
+def test_cli_profile(tmp_path, monkeypatch):
+    input_file = tmp_path / "input.pdf"
+    shutil.copy("tests/sample/A4.pdf", input_file)
+    (tmp_path / "config.toml").write_text(cfg_template, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["addpn", str(input_file), "--profile", "compact"])
+    assert cli.main() == 0
+
+    [output] = [p for p in tmp_path.glob("input_*.pdf")]
+    with pikepdf.open(output) as pdf:
+        assert any(
+            isinstance(obj, pikepdf.Stream) and obj.get("/Type") == "/ObjStm"
+            for obj in pdf.objects
+        )
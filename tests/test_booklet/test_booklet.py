@@ -1,6 +1,16 @@
+import os
+import subprocess
+import sys
 from pathlib import Path
 
+import pikepdf
+import pytest
+from pypdf import PdfReader
+
+from py_pdf._com.profile import PROFILES
+from py_pdf._com.qpdf import BACKENDS
 from py_pdf.booklet import make_booklet, split_booklet
+from py_pdf.paper import make_paper, split_paper
 
 VERTICAL = True
 
@@ -15,3 +25,187 @@ def test_it():
     fp = make_booklet(fp, fp.with_name("m1.pdf"), VERTICAL)
     fp = make_booklet(fp, fp.with_name("m2.pdf"), VERTICAL)
     fp = make_booklet(fp, fp.with_name("m3.pdf"), VERTICAL)
+
+
+def _image_pdf(path: Path, n: int, size: int = 200_000):
+    """每页一张不可压缩的独立图片。"""
+    side = int((size / 3) ** 0.5)
+    with pikepdf.new() as pdf:
+        for _ in range(n):
+            page = pdf.add_blank_page(page_size=(595, 842))
+            image = pikepdf.Stream(
+                pdf,
+                os.urandom(side * side * 3),
+                Type=pikepdf.Name.XObject,
+                Subtype=pikepdf.Name.Image,
+                Width=side,
+                Height=side,
+                ColorSpace=pikepdf.Name.DeviceRGB,
+                BitsPerComponent=8,
+            )
+            page.Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image))
+            page.Contents = pikepdf.Stream(pdf, b"q 500 0 0 500 40 40 cm /Im0 Do Q")
+        pdf.save(path)
+
+
+def _peak_rss(func: str, input_path: Path, output_path: Path) -> int:
+    script = f"""\
+import resource
+from py_pdf.booklet import {func}
+{func}({str(input_path)!r}, {str(output_path)!r})
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+    res = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True, text=True
+    )
+    return int(res.stdout.split()[-1])
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss is in KiB on Linux")
+def test_memory_flat(tmp_path: Path):
+    small = tmp_path / "small.pdf"
+    large = tmp_path / "large.pdf"
+    _image_pdf(small, 40)
+    _image_pdf(large, 160)
+    growth = large.stat().st_size - small.stat().st_size
+
+    rss_small = _peak_rss("make_booklet", small, tmp_path / "small-booklet.pdf")
+    rss_large = _peak_rss("make_booklet", large, tmp_path / "large-booklet.pdf")
+    # 输入增大约 24 MB，峰值内存的增长应远小于此
+    assert (rss_large - rss_small) * 1024 < growth / 4
+
+
+def _duplicated_pdf(path: Path, copies: int):
+    """同一文件复制多份拼接，每份各带一套字体和图片。"""
+    with pikepdf.new() as pdf:
+        for _ in range(copies):
+            with pikepdf.open("tests/sample/A4.pdf") as src:
+                pdf.pages.extend(src.pages)
+        pdf.save(path)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_profiles(tmp_path: Path, backend: str):
+    input_path = tmp_path / "input.pdf"
+    _duplicated_pdf(input_path, 2)
+
+    sizes, fonts = {}, {}
+    for name, profile in PROFILES.items():
+        output_path = make_booklet(
+            input_path, tmp_path / f"{name}.pdf", profile=profile, backend=backend
+        )
+        sizes[name] = output_path.stat().st_size
+        with pikepdf.open(output_path) as pdf:
+            assert len(pdf.pages) == 10
+            assert pdf.is_linearized == profile.linearize
+            assert not pdf.get_warnings()
+            fonts[name] = sum(
+                isinstance(obj, pikepdf.Stream) and "/Length1" in obj
+                for obj in pdf.objects
+            )
+            # 两份副本中相同的页面共用一个 Form XObject
+            forms = {
+                form.objgen
+                for page in pdf.pages
+                for form in page.Resources.XObject.values()
+            }
+            assert len(forms) == 10
+    # 两份输入各嵌入一份字体，去重后只剩一份
+    assert fonts == {"fast": 2, "compact": 1, "web": 1}
+    assert sizes["compact"] < sizes["fast"]
+
+
+def test_backends(tmp_path: Path):
+    cases = [
+        (make_booklet, "A4.pdf"),
+        (make_paper, "A4.pdf"),
+        (split_booklet, "A3-booklet.pdf"),
+        (split_paper, "A3-paper.pdf"),
+    ]
+    for func, name in cases:
+        res = []
+        for backend in BACKENDS:
+            output_path = func(
+                Path("tests/sample") / name,
+                tmp_path / f"{backend}.pdf",
+                backend=backend,
+            )
+            pages = PdfReader(output_path).pages
+            res.append(
+                [([float(x) for x in p.mediabox], p.extract_text()) for p in pages]
+            )
+        assert res[0] == res[1], func.__name__
+
+    # 硬裁剪拼版后的文件：每张纸左右各一个表单，两个后端删去相同的表单
+    sheets = make_booklet("tests/sample/A4.pdf", tmp_path / "sheets.pdf")
+    res = []
+    for backend in BACKENDS:
+        output_path = split_booklet(
+            sheets,
+            tmp_path / f"hard-{backend}.pdf",
+            hard=True,
+            backend=backend,
+        )
+        with pikepdf.open(output_path) as pdf:
+            assert not pdf.get_warnings()
+            res.append(
+                [
+                    sorted(page.Resources.get("/XObject", {}).keys())
+                    for page in pdf.pages
+                ]
+            )
+    assert res[0] == res[1]
+    assert all(len(names) <= 1 for names in res[0])
+    assert sum(len(names) for names in res[0]) == 10
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_empty(tmp_path: Path, backend: str):
+    input_path = tmp_path / "empty.pdf"
+    with pikepdf.new() as pdf:
+        pdf.save(input_path)
+    for func in (make_booklet, make_paper, split_booklet, split_paper):
+        output_path = func(input_path, tmp_path / "output.pdf", backend=backend)
+        with pikepdf.open(output_path) as pdf:
+            assert len(pdf.pages) == 0
+
+
+def test_backends_annots(tmp_path: Path):
+    # 两个后端复制相同的注释，/Rect 按放置的位置换算
+    input_path = tmp_path / "annots.pdf"
+    with pikepdf.open("tests/sample/A4.pdf") as pdf:
+        for i, page in enumerate(pdf.pages):
+            page.Annots = pdf.make_indirect(
+                pikepdf.Array(
+                    [
+                        pikepdf.Dictionary(
+                            Type=pikepdf.Name.Annot,
+                            Subtype=pikepdf.Name.Link,
+                            Rect=pikepdf.Array([10, 20 + i, 30, 40]),
+                            A=pikepdf.Dictionary(
+                                S=pikepdf.Name.URI, URI=pikepdf.String(f"p{i}")
+                            ),
+                            P=page.obj,
+                        )
+                    ]
+                )
+            )
+        pdf.save(input_path)
+
+    res = []
+    for backend in BACKENDS:
+        output_path = make_booklet(
+            input_path, tmp_path / f"{backend}.pdf", backend=backend
+        )
+        with pikepdf.open(output_path) as pdf:
+            res.append(
+                [
+                    [
+                        (str(a.A.URI), [float(v) for v in a.Rect], "/P" in a)
+                        for a in page.get("/Annots", [])
+                    ]
+                    for page in pdf.pages
+                ]
+            )
+    assert res[0] == res[1]
+    assert sum(len(annots) for annots in res[0]) == 10
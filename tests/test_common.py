@@ -1,6 +1,12 @@
+import io
+
+import pikepdf
 import pytest
+from pikepdf import Array, Dictionary, Name, String
+from pypdf import PageObject, PdfReader
 
-from py_pdf._com import sort_from_booklet, sort_to_booklet
+from py_pdf._com import Imposer, crop_page, sort_from_booklet, sort_to_booklet
+from py_pdf._com.writer import StreamingWriter
 
 
 def test_sort_from_booklet():
@@ -17,3 +23,165 @@ def test_sort_to_booklet():
 
     with pytest.raises(ValueError):
         sort_to_booklet([1, 2, 3])
+
+
+def test_imposer():
+    reader = PdfReader("tests/sample/A4.pdf")
+    page1, page2 = reader.pages[0], reader.pages[1]
+    output = io.BytesIO()
+    writer = StreamingWriter(output)
+    imposer = Imposer(writer)
+
+    writer.add_page(imposer.merge_two_pages(page1, page2, True))
+    # 同一个源页面只包装一次
+    assert imposer.form(page1) is imposer.form(page1)
+    writer.add_page(imposer.merge_two_pages(page1, page1, True))
+    writer.close()
+
+    sheet, sheet2 = PdfReader(output).pages
+    assert sheet.mediabox.width == page1.mediabox.width + page2.mediabox.width
+    xobjects = sheet["/Resources"]["/XObject"]
+    assert xobjects["/P0"]["/Subtype"] == "/Form"
+    assert xobjects["/P0"].get_data() == page1.get_contents().get_data()
+    assert b"cm /P1 Do" in sheet.get_contents().get_data()
+
+    xobjects2 = sheet2["/Resources"]["/XObject"]
+    assert xobjects2.raw_get("/P0") == xobjects2.raw_get("/P1")
+    assert xobjects2.raw_get("/P0") == xobjects.raw_get("/P0")
+
+
+def test_imposer_dedup(tmp_path):
+    # 第 1、3 页内容相同但对象各自独立，第 4 页是补齐的空白页
+    path = tmp_path / "dup.pdf"
+    with pikepdf.new() as pdf:
+        sources = [pikepdf.open("tests/sample/A4.pdf") for _ in range(3)]
+        for src, i in zip(sources, [0, 1, 0]):
+            pdf.pages.append(src.pages[i])
+        pdf.save(path)
+        for src in sources:
+            src.close()
+
+    reader = PdfReader(path)
+    page1, page2, page3 = reader.pages
+    assert (
+        page1["/Contents"].indirect_reference != page3["/Contents"].indirect_reference
+    )
+    blank = PageObject.create_blank_page(None, 100, 100)
+
+    output = io.BytesIO()
+    writer = StreamingWriter(output)
+    imposer = Imposer(writer)
+    writer.add_page(imposer.merge_two_pages(page1, page2, True))
+    writer.add_page(imposer.merge_two_pages(page3, blank, True))
+    writer.close()
+
+    sheet1, sheet2 = PdfReader(output).pages
+    xobjects1 = sheet1["/Resources"]["/XObject"]
+    xobjects2 = sheet2["/Resources"]["/XObject"]
+    assert xobjects1.raw_get("/P0") == xobjects2.raw_get("/P0")
+    assert "/P1" not in xobjects2
+    assert b"/P1" not in sheet2.get_contents().get_data()
+
+
+def test_crop_page_shares_content():
+    reader = PdfReader("tests/sample/A3-paper.pdf")
+    page = reader.pages[0]
+    left, right = crop_page(page, True)
+    assert left.raw_get("/Contents") is page.raw_get("/Contents")
+    assert right.raw_get("/Resources") is page.raw_get("/Resources")
+    assert left.mediabox.right == right.mediabox.left == page.mediabox.width / 2
+
+
+def test_crop_page_hard(tmp_path):
+    # 拼版后的每张纸左右各放一个表单，硬裁剪后每个半页只保留自己的那个
+    path = tmp_path / "paper.pdf"
+    with open(path, "wb") as f:
+        writer = StreamingWriter(f)
+        imposer = Imposer(writer)
+        page1, page2 = PdfReader("tests/sample/A4.pdf").pages[:2]
+        writer.add_page(imposer.merge_two_pages(page1, page2, True))
+        writer.close()
+
+    sheet = PdfReader(path).pages[0]
+    left, right = crop_page(sheet, True, hard=True)
+    assert list(left["/Resources"]["/XObject"]) == ["/P0"]
+    assert list(right["/Resources"]["/XObject"]) == ["/P1"]
+    assert b"/P1" not in left.get_contents().get_data()
+    assert b"/P0" not in right.get_contents().get_data()
+
+
+def test_imposer_annots(tmp_path):
+    # 第 2 页有一个外部链接、一个带弹出窗口的文字注释和一个指向第 1 页的链接
+    path = tmp_path / "annots.pdf"
+    with pikepdf.new() as pdf:
+        pdf.add_blank_page(page_size=(200, 300))
+        page = pdf.add_blank_page(page_size=(200, 300))
+        uri = pdf.make_indirect(
+            Dictionary(
+                Type=Name.Annot,
+                Subtype=Name.Link,
+                Rect=Array([10, 20, 30, 40]),
+                A=Dictionary(S=Name.URI, URI=String("https://example.com")),
+                P=page.obj,
+            )
+        )
+        text = pdf.make_indirect(
+            Dictionary(Type=Name.Annot, Subtype=Name.Text, Rect=Array([0, 0, 5, 5]))
+        )
+        popup = pdf.make_indirect(
+            Dictionary(
+                Type=Name.Annot,
+                Subtype=Name.Popup,
+                Rect=Array([0, 0, 50, 50]),
+                Parent=text,
+            )
+        )
+        text.Popup = popup
+        goto = Dictionary(
+            Type=Name.Annot,
+            Subtype=Name.Link,
+            Rect=Array([0, 0, 10, 10]),
+            Dest=Array([pdf.pages[0].obj, Name.Fit]),
+        )
+        page.Annots = Array([uri, text, popup, goto])
+        pdf.save(path)
+
+    page1, page2 = PdfReader(path).pages
+    output = io.BytesIO()
+    writer = StreamingWriter(output)
+    writer.add_page(Imposer(writer).merge_two_pages(page1, page2, True))
+    writer.close()
+
+    reader = PdfReader(output)
+    assert len(reader.pages) == 1
+    annots = [a.get_object() for a in reader.pages[0]["/Annots"]]
+    # 第 2 页放在右半边，注释向右平移 200
+    assert [a["/Subtype"] for a in annots] == ["/Link", "/Text", "/Popup"]
+    assert [float(v) for v in annots[0]["/Rect"]] == [210, 20, 230, 40]
+    assert "/P" not in annots[0]
+    assert annots[1]["/Popup"].get_object() is annots[2]
+    assert annots[2]["/Parent"].get_object() is annots[1]
+
+
+def test_crop_page_hard_straddling_image(tmp_path):
+    # 扫描的页面：一张覆盖全页的图片跨越中线，硬裁剪不裁剪图片，两个半页都保留它
+    path = tmp_path / "scan.pdf"
+    with pikepdf.new() as pdf:
+        page = pdf.add_blank_page(page_size=(400, 300))
+        image = pdf.make_stream(
+            bytes(8 * 6 * 3),
+            Type=Name.XObject,
+            Subtype=Name.Image,
+            Width=8,
+            Height=6,
+            ColorSpace=Name.DeviceRGB,
+            BitsPerComponent=8,
+        )
+        page.Resources = Dictionary(XObject=Dictionary(Im0=image))
+        page.Contents = pdf.make_stream(b"q 400 0 0 300 0 0 cm /Im0 Do Q")
+        pdf.save(path)
+
+    page = PdfReader(path).pages[0]
+    for half in crop_page(page, True, hard=True):
+        assert half.raw_get("/Contents") is page.raw_get("/Contents")
+        assert half.raw_get("/Resources") is page.raw_get("/Resources")
@@ -1,6 +1,18 @@
+import shutil
 from pathlib import Path
 
-from py_pdf.outline.core import get_outline, remove_outline, set_outline
+import pikepdf
+from pikepdf import Array, Dictionary, Name, OutlineItem, String
+
+from py_pdf._com.profile import PROFILES
+from py_pdf.outline.core import (
+    NameTree,
+    get_outline,
+    read_manifest,
+    remove_outline,
+    set_outline,
+    set_outline_batch,
+)
 
 this_dir = Path(__file__).parent
 
@@ -26,3 +38,203 @@ def test_all():
     output_path2 = this_dir / "output2.pdf"
     remove_outline(output_path, output_path2)
     assert get_outline(output_path2) == ""
+
+
+def test_incremental(tmp_path):
+    pdf_path = Path("tests/sample/outline.pdf")
+    outline_path = Path("tests/sample/outline.txt")
+    original = pdf_path.read_bytes()
+
+    output_path = tmp_path / "output.pdf"
+    assert set_outline(pdf_path, output_path, outline_path, 0, incremental=True)
+    assert output_path.read_bytes().startswith(original)
+    assert (
+        get_outline(output_path).strip()
+        == outline_path.read_text(encoding="utf-8").strip()
+    )
+
+    output_path2 = tmp_path / "output2.pdf"
+    remove_outline(output_path, output_path2, incremental=True)
+    assert output_path2.read_bytes().startswith(output_path.read_bytes())
+    assert get_outline(output_path2) == ""
+
+
+def _gapped_pdf() -> bytes:
+    """对象号为 1-4、20、21，/Size 22 的文件。"""
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [3 0 R 20 0 R] /Count 2 >>",
+        3: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Contents 4 0 R >>",
+        4: b"<< /Length 0 >>\nstream\n\nendstream",
+        20: b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Contents 21 0 R >>",
+        21: b"<< /Length 0 >>\nstream\n\nendstream",
+    }
+    data = bytearray(b"%PDF-1.7\n")
+    offsets = {}
+    for num, body in objects.items():
+        offsets[num] = len(data)
+        data += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(data)
+    data += b"xref\n0 22\n0000000000 65535 f \n"
+    for num in range(1, 22):
+        if num in offsets:
+            data += b"%010d 00000 n \n" % offsets[num]
+        else:
+            data += b"0000000000 00000 f \n"
+    data += b"trailer\n<< /Size 22 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref
+    return bytes(data)
+
+
+def test_incremental_gapped(tmp_path):
+    # 对象号不连续时，新对象的编号大于最大的对象号而不是对象数
+    pdf_path = tmp_path / "gapped.pdf"
+    pdf_path.write_bytes(_gapped_pdf())
+    outline_path = tmp_path / "outline.txt"
+    outline_path.write_text("# a 1\n## b 2\n# c 2\n", encoding="utf-8")
+
+    output_path = tmp_path / "output.pdf"
+    assert set_outline(pdf_path, output_path, outline_path, 0, incremental=True)
+    with pikepdf.open(output_path) as pdf:
+        assert int(pdf.trailer.Size) > max(obj.objgen[0] for obj in pdf.objects)
+        assert pdf.pages[1].objgen == (20, 0)
+    lines = get_outline(output_path).splitlines()
+    assert [line.split()[-1] for line in lines] == ["1", "2", "2"]
+
+    output_path2 = tmp_path / "output2.pdf"
+    remove_outline(output_path, output_path2, incremental=True)
+    assert output_path2.read_bytes().startswith(output_path.read_bytes())
+    assert get_outline(output_path2) == ""
+
+
+def test_named_destinations(tmp_path):
+    # 命名目标放在名称树的子节点中
+    pdf = pikepdf.new()
+    for _ in range(3):
+        pdf.add_blank_page()
+    dests = Array()
+    for name, page in (("a", 2), ("b", 1)):
+        dests.append(String(name))
+        dests.append(Dictionary(D=Array([pdf.pages[page].obj, Name.Fit])))
+    leaf = pdf.make_indirect(
+        Dictionary(Names=dests, Limits=Array([String("a"), String("b")]))
+    )
+    pdf.Root.Names = Dictionary(Dests=Dictionary(Kids=Array([leaf])))
+    with pdf.open_outline() as outline:
+        outline.root.append(OutlineItem("first", String("a")))
+        outline.root.append(OutlineItem("second", String("b")))
+        outline.root.append(OutlineItem("third", 0))
+    path = tmp_path / "named.pdf"
+    pdf.save(path)
+
+    lines = get_outline(path).splitlines()
+    assert [line.split()[-1] for line in lines] == ["3", "2", "1"]
+
+
+def test_name_tree():
+    # 三层名称树，叶子节点每个包含 4 个名称
+    pdf = pikepdf.new()
+    keys = [f"n{i:03d}" for i in range(64)]
+
+    def node(keys: list[str]):
+        if len(keys) <= 4:
+            names = Array()
+            for k in keys:
+                names.extend([String(k), Array([int(k[1:])])])
+            res = Dictionary(Names=names)
+        else:
+            step = -(-len(keys) // 4)
+            kids = [node(keys[i : i + step]) for i in range(0, len(keys), step)]
+            res = Dictionary(Kids=Array(kids))
+        res.Limits = Array([String(keys[0]), String(keys[-1])])
+        return pdf.make_indirect(res)
+
+    tree = NameTree(node(keys))
+    for k in keys:
+        assert tree.get(k.encode())[0] == int(k[1:])
+    assert tree.get(b"m") is None and tree.get(b"n0005") is None
+    # 只读取了被查找的叶子
+    assert len(tree.leaves) == 16
+
+    tree = NameTree(node(keys))
+    tree.get(b"n010")
+    assert len(tree.leaves) == 1
+
+
+def test_legacy_dests(tmp_path):
+    pdf = pikepdf.new()
+    for _ in range(3):
+        pdf.add_blank_page()
+    pdf.Root.Dests = Dictionary(
+        {"/c": Array([pdf.pages[2].obj, Name.Fit]), "/b": Array([pdf.pages[1].obj])}
+    )
+    with pdf.open_outline() as outline:
+        outline.root.append(OutlineItem("name", Name("/c")))
+        outline.root.append(OutlineItem("string", String("b")))
+    path = tmp_path / "legacy.pdf"
+    pdf.save(path)
+
+    lines = get_outline(path).splitlines()
+    assert [line.split()[-1] for line in lines] == ["3", "2"]
+
+
+def test_batch(tmp_path):
+    sample = Path("tests/sample/outline.pdf").absolute()
+    outline_path = Path("tests/sample/outline.txt").absolute()
+    for name in ("a", "b"):
+        shutil.copy(sample, tmp_path / f"{name}.pdf")
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        f"# pdf,outline,offset\na.pdf,{outline_path}\n\nb.pdf,{outline_path},100\n",
+        encoding="utf-8",
+    )
+
+    entries = read_manifest(manifest)
+    assert [(e.pdf.name, e.offset) for e in entries] == [("a.pdf", 0), ("b.pdf", 100)]
+
+    results = {
+        entry.pdf.name: (output_path, error)
+        for entry, output_path, error in set_outline_batch(entries, jobs=2)
+    }
+    output_path, error = results["a.pdf"]
+    assert error is None
+    assert get_outline(output_path).strip() == outline_path.read_text("utf-8").strip()
+    output_path, error = results["b.pdf"]
+    assert error is not None and "out of range" in error
+    assert not output_path.exists()
+
+
+def test_profiles(tmp_path):
+    # 同一文件复制两份拼接，每份各嵌入一份字体
+    input_path = tmp_path / "input.pdf"
+    with pikepdf.new() as pdf:
+        for _ in range(2):
+            with pikepdf.open("tests/sample/A4.pdf") as src:
+                pdf.pages.extend(src.pages)
+        pdf.save(input_path)
+    outline_path = tmp_path / "outline.txt"
+    outline_path.write_text("# a 1\n# b 11\n", encoding="utf-8")
+
+    sizes, fonts = {}, {}
+    for name, profile in PROFILES.items():
+        output_path = tmp_path / f"{name}.pdf"
+        assert set_outline(input_path, output_path, outline_path, 0, profile=profile)
+        sizes[name] = output_path.stat().st_size
+        with pikepdf.open(output_path) as pdf:
+            fonts[name] = sum(
+                isinstance(obj, pikepdf.Stream) and "/Length1" in obj
+                for obj in pdf.objects
+            )
+        assert (
+            get_outline(output_path).splitlines()
+            == get_outline(tmp_path / "fast.pdf").splitlines()
+        )
+
+        output_path = tmp_path / f"{name}-rm.pdf"
+        remove_outline(tmp_path / f"{name}.pdf", output_path, profile=profile)
+        with pikepdf.open(output_path) as pdf:
+            assert fonts[name] == sum(
+                isinstance(obj, pikepdf.Stream) and "/Length1" in obj
+                for obj in pdf.objects
+            )
+    assert fonts == {"fast": 2, "compact": 1, "web": 1}
+    assert sizes["compact"] < sizes["fast"]
@@ -1,4 +1,11 @@
-from py_pdf.outline.parser import OutlineItem, OutlineItemNode, parse_from_text
+from py_pdf.outline.parser import (
+    CompactOutline,
+    OutlineItem,
+    OutlineItemNode,
+    parse_from_text,
+    parse_lines,
+    serialize_lines,
+)
 
 test_cases = [
     (
@@ -62,3 +69,11 @@ test_cases = [
 def test_parse_from_text_parameterized():
     for s, expected in test_cases:
         assert parse_from_text(s).children == expected
+
+
+def test_compact_outline():
+    lines = ["# 第一章 1", "## Section 1.1   2", "invalid", "# 第二章 10"]
+    outline = CompactOutline.from_lines(lines)
+    assert len(outline) == 3
+    assert list(outline) == [(1, "第一章", 1), (2, "Section 1.1", 2), (1, "第二章", 10)]
+    assert list(serialize_lines(outline)) == list(serialize_lines(parse_lines(lines)))
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pikepdf
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from py_pdf._com.pagecount import PageCountError, count_pages
+from py_pdf.statpage import PathAndCount, read_pdf
+
+A4 = Path("tests/sample/A4.pdf")
+
+
+def test_sample():
+    for path in Path("tests/sample").glob("*.pdf"):
+        assert count_pages(path) == len(PdfReader(path).pages)
+
+
+def test_object_stream(tmp_path: Path):
+    output = tmp_path / "objstm.pdf"
+    with pikepdf.open(A4) as pdf:
+        pdf.save(output, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    assert count_pages(output) == 10
+
+
+def test_incremental_update(tmp_path: Path):
+    output = tmp_path / "incremental.pdf"
+    writer = PdfWriter(A4, incremental=True)
+    writer.add_blank_page(100, 100)
+    writer.write(output)
+    assert count_pages(output) == 11
+
+
+def test_fallback(tmp_path: Path):
+    broken = tmp_path / "broken.pdf"
+    data = A4.read_bytes()
+    data = data[: data.rfind(b"startxref")] + b"startxref\n12345\n%%EOF\n"
+    broken.write_bytes(data)
+    with pytest.raises(PageCountError):
+        count_pages(broken)
+    assert read_pdf(broken) == PathAndCount(broken, 10)
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pytest
+from pypdf import PdfReader
+
+from py_pdf.outline.core import get_outline
+from py_pdf.pipeline import parse_recipe, run_pipeline
+
+OUTLINE = """\
+# a 1
+## b 5
+# c 10
+"""
+
+
+def _run(tmp_path: Path, input_path: str, recipe: str) -> Path:
+    (tmp_path / "outline.txt").write_text(OUTLINE, encoding="utf-8")
+    steps, profile = parse_recipe(recipe, tmp_path)
+    return run_pipeline(input_path, tmp_path / "output.pdf", steps, profile)
+
+
+def _outline_pages(path: Path) -> list[int]:
+    return [int(line.split()[-1]) for line in get_outline(path).splitlines()]
+
+
+def test_booklet(tmp_path: Path):
+    recipe = """\
+[[steps]]
+op = "addpn"
+num-fmt = "-{:d}-"
+
+[[steps]]
+op = "outline"
+file = "outline.txt"
+
+[[steps]]
+op = "booklet"
+"""
+    output = _run(tmp_path, "tests/sample/A4.pdf", recipe)
+    pages = PdfReader(output).pages
+    # 10 页补齐到 12 页，排成 6 张：[12 1] [2 11] [10 3] [4 9] [8 5] [6 7]
+    assert len(pages) == 6
+    assert "-1-" in pages[0].extract_text()
+    assert "-10-" in pages[2].extract_text()
+    assert _outline_pages(output) == [1, 5, 3]
+
+
+def test_split(tmp_path: Path):
+    recipe = """\
+profile = "compact"
+
+[[steps]]
+op = "paper"
+action = "split"
+
+[[steps]]
+op = "outline"
+file = "outline.txt"
+
+[[steps]]
+op = "paper"
+action = "make"
+"""
+    # 分割成 20 个半页后设置大纲，再两两合并，第 1、5、10 个半页在第 1、3、5 张
+    output = _run(tmp_path, "tests/sample/A4.pdf", recipe)
+    assert len(PdfReader(output).pages) == 10
+    assert _outline_pages(output) == [1, 3, 5]
+
+
+def test_labels_before_imposition(tmp_path: Path):
+    recipe = """\
+[[steps]]
+op = "addpn"
+page-labels = true
+
+[[steps]]
+op = "booklet"
+"""
+    with pytest.raises(ValueError):
+        _run(tmp_path, "tests/sample/A4.pdf", recipe)
@@ -1,6 +1,16 @@
+import shutil
 from pathlib import Path
 
-from py_pdf.statpage import PathAndCount, stat_pdf
+import pikepdf
+
+from py_pdf import statpage
+from py_pdf.statpage import (
+    Budget,
+    PathAndCount,
+    SkippedFile,
+    StatCache,
+    stat_pdf,
+)
 
 A4 = Path("tests/sample/A4.pdf")
 A3 = Path("tests/sample/A3-booklet.pdf")
@@ -13,3 +23,65 @@ def test_it():
     assert f([A4]) == [PathAndCount(A4, 10)]
     assert f([A3]) == [PathAndCount(A3, 4)]
     assert f([A4, A3]) == [PathAndCount(A4, 10), PathAndCount(A3, 4)]
+
+
+def test_jobs():
+    sample = Path("tests/sample")
+
+    def key(item: PathAndCount):
+        return item.path
+
+    serial = sorted(stat_pdf([sample]), key=key)
+    parallel = sorted(stat_pdf([sample, A4], jobs=2), key=key)
+
+    assert len(serial) > 0
+    assert parallel == sorted(serial + [PathAndCount(A4, 10)], key=key)
+
+
+def test_cache(tmp_path: Path, monkeypatch):
+    root = tmp_path / "pdf"
+    root.mkdir()
+    shutil.copy(A4, root / "a4.pdf")
+    shutil.copy(A3, root / "a3.pdf")
+    db = tmp_path / "cache.db"
+
+    def f(jobs=1):
+        with StatCache(db) as cache:
+            return sorted((i.path.name, i.count) for i in stat_pdf([root], jobs, cache))
+
+    expected = [("a3.pdf", 4), ("a4.pdf", 10)]
+    assert f() == expected
+
+    opened = []
+    read = statpage._read
+    monkeypatch.setattr(
+        statpage, "_read", lambda path: opened.append(path) or read(path)
+    )
+    assert f() == expected
+    assert opened == []
+
+    shutil.copy(A3, root / "a4.pdf")
+    (root / "a3.pdf").unlink()
+    assert f() == [("a4.pdf", 4)]
+    assert opened == [root / "a4.pdf"]
+
+    with StatCache(db) as cache:
+        assert cache.conn.execute("SELECT count(*) FROM pages").fetchone() == (1,)
+
+
+def test_budget(tmp_path: Path):
+    # 损坏的 startxref 迫使回退到 pypdf 重建交叉引用表，耗时远超上限
+    slow = tmp_path / "slow.pdf"
+    with pikepdf.new() as pdf:
+        for _ in range(5000):
+            pdf.add_blank_page()
+        pdf.save(slow)
+    data = slow.read_bytes()
+    slow.write_bytes(data[: data.rfind(b"startxref")] + b"startxref\n1\n%%EOF\n")
+
+    skipped = list[SkippedFile]()
+    res = list(stat_pdf([A4, slow], 2, budget=Budget(timeout=0.2), skipped=skipped))
+    assert res == [PathAndCount(A4, 10)]
+    assert len(skipped) == 1
+    assert skipped[0].path == slow
+    assert skipped[0].reason.startswith("timeout")